@@ -0,0 +1,279 @@
+#! /usr/bin/env python
+#coding: utf-8
+"""Measures pytddmon's own overhead on a generated tree of files: how long
+finding files and looking for changes takes, how much a test run costs
+besides the tests themselves, and how much memory it takes. The results are
+written as JSON, and compared with an earlier result (the baseline) if one
+is given."""
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+import pytddmon
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+try:
+    import resource
+except ImportError:
+    resource = None
+
+TEST_MODULE = '''import unittest
+
+
+class Test(unittest.TestCase):
+    def test_%(index)i(self):
+        self.assertEqual(%(index)i, %(index)i)
+'''
+
+MODULE = '''def function_%(index)i(value):
+    return value + %(index)i
+'''
+
+
+def generate_tree(root, files, test_modules, depth, files_per_folder=50,
+                  branching=8):
+    """Writes files .py files below root, test_modules of them with a test,
+    in packages nested depth folders deep"""
+    folders = set()
+    for index in range(files):
+        folder = index // files_per_folder
+        parts = []
+        for _ in range(depth):
+            parts.append('pkg%i' % (folder % branching))
+            folder //= branching
+        path = os.path.join(root, *parts)
+        if path not in folders:
+            make_package(root, parts)
+            folders.add(path)
+        if index < test_modules:
+            name, template = 'test_%i.py' % index, TEST_MODULE
+        else:
+            name, template = 'mod_%i.py' % index, MODULE
+        with open(os.path.join(path, name), 'w') as f:
+            f.write(template % {'index': index})
+
+
+def make_package(root, parts):
+    path = root
+    for part in parts:
+        path = os.path.join(path, part)
+        if not os.path.isdir(path):
+            os.mkdir(path)
+            open(os.path.join(path, '__init__.py'), 'w').close()
+
+
+def best_time(func, repeat, after=None, min_total_seconds=0.5):
+    """the shortest of repeat timings of func, in seconds. Quick functions
+    are timed more often, until they took min_total_seconds together, since
+    their timings vary more. after is called, untimed, after each timing."""
+    timings = []
+    while len(timings) < repeat or (
+            sum(timings) < min_total_seconds and len(timings) < 1000):
+        start = time.time()
+        func()
+        timings.append(time.time() - start)
+        if after is not None:
+            after()
+    return min(timings)
+
+
+def close_monitor(monitor):
+    """closes the inotify file descriptor of monitor, if it has one"""
+    inotify = getattr(monitor, 'inotify', None)
+    if inotify is not None:
+        inotify.close()
+
+
+def measure_scanning(root, repeat):
+    results = {}
+    file_finder = pytddmon.FileFinder(root, pytddmon.wildcard_to_regex('*.py'))
+    results['files_found'] = len(list(file_finder()))
+    results['find_files_seconds'] = best_time(
+        lambda: list(file_finder()), repeat)
+    for polling in (True, False):
+        monitors = []
+
+        def close_all_but_last():
+            for monitor in monitors[:-1]:
+                close_monitor(monitor)
+            del monitors[:-1]
+        seconds = best_time(
+            lambda: monitors.append(
+                pytddmon.build_stat_monitor(file_finder, polling)),
+            repeat, close_all_but_last)
+        monitor = monitors[-1]
+        name = type(monitor).__name__
+        results[name + '_start_seconds'] = seconds
+        results[name + '_unchanged_seconds'] = best_time(
+            monitor.look_for_changes, repeat)
+        changed_file = os.path.join(root, sorted(os.listdir(root))[0],
+                                    '__init__.py')
+
+        def change_and_look():
+            future = time.time() + 60
+            os.utime(changed_file, (future, future))
+            monitor.look_for_changes()
+        results[name + '_one_change_seconds'] = best_time(
+            change_and_look, repeat)
+        close_monitor(monitor)
+    return results
+
+
+def measure_memory(root):
+    results = {}
+    if tracemalloc is not None:
+        file_finder = pytddmon.FileFinder(
+            root, pytddmon.wildcard_to_regex('*.py'))
+        tracemalloc.start()
+        monitor = pytddmon.build_stat_monitor(file_finder, polling=True)
+        monitor.look_for_changes()
+        results['monitor_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        close_monitor(monitor)
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if platform.system() != 'Darwin':
+            max_rss *= 1024
+        results['max_rss_bytes'] = max_rss
+    return results
+
+
+class NoChanges:
+    def look_for_changes(self):
+        return False
+
+
+def measure_test_runs(root, test_modules, jobs, repeat):
+    """Runs the generated tests: once for a single test module, which is
+    mostly fixed overhead, and once for all test modules"""
+    results = {}
+    cwd = os.getcwd()
+    os.chdir(root)
+    sys.path.insert(0, root)
+    try:
+        for name, regex in [
+            ('one_module', pytddmon.wildcard_to_regex('test_0.py')),
+            ('all_modules', pytddmon.wildcard_to_regex('test_*.py')),
+        ]:
+            file_finder = pytddmon.FileFinder(root, regex)
+            engine = pytddmon.Pytddmon(file_finder, NoChanges(), jobs=jobs)
+            seconds = best_time(engine.run_tests, repeat)
+            results['run_%s_seconds' % name] = seconds
+            if name == 'all_modules':
+                assert engine.total_tests_passed == test_modules, \
+                    engine.get_log()
+                results['run_seconds_per_module'] = seconds / test_modules
+    finally:
+        sys.path.remove(root)
+        os.chdir(cwd)
+    return results
+
+
+def compare(results, baseline, tolerance, min_seconds):
+    """prints how results compare with baseline, returns the names of the
+    measurements that got worse by more than tolerance (a fraction). Timings
+    that got worse by less than min_seconds are within the noise, however
+    big a fraction that is."""
+    regressions = []
+    print('%-36s %12s %12s %8s' % ('measurement', 'baseline', 'now', 'change'))
+    for name in sorted(results):
+        if name not in baseline or name == 'files_found':
+            continue
+        old, new = baseline[name], results[name]
+        change = (new - old) / float(old) if old else 0.0
+        flag = ''
+        if change > tolerance and not (
+                name.endswith('_seconds') and new - old < min_seconds):
+            regressions.append(name)
+            flag = ' REGRESSION'
+        print('%-36s %12.6g %12.6g %+7.1f%%%s' % (
+            name, old, new, change * 100, flag))
+    return regressions
+
+
+def run_all():
+    options = parse_commandline()
+    if options.test_modules > options.files:
+        sys.exit('--test-modules can not be more than --files')
+    root = tempfile.mkdtemp(prefix='pytddmon_benchmark_')
+    try:
+        start = time.time()
+        generate_tree(root, options.files, options.test_modules, options.depth)
+        generate_seconds = time.time() - start
+        results = measure_scanning(root, options.repeat)
+        results.update(measure_test_runs(
+            root, options.test_modules, options.jobs, options.repeat))
+        results.update(measure_memory(root))
+    finally:
+        shutil.rmtree(root)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'files': options.files,
+        'test_modules': options.test_modules,
+        'depth': options.depth,
+        'jobs': options.jobs,
+        'generate_seconds': generate_seconds,
+        'results': results,
+    }
+    with open(options.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print('Wrote ' + options.output)
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        if [baseline.get(key) for key in ('files', 'test_modules', 'depth')] \
+                != [options.files, options.test_modules, options.depth]:
+            print('Warning: the baseline was measured on another tree size')
+        if compare(results, baseline['results'], options.tolerance,
+                   options.min_seconds):
+            sys.exit(1)
+
+
+def parse_commandline():
+    parser = OptionParser()
+    parser.add_option('-f', '--files', type='int', default=10000,
+                      help='Generate FILES .py files. Default is %default.')
+    parser.add_option('-t', '--test-modules', type='int', default=200,
+                      help='Of the files, make TEST_MODULES test modules '
+                           'with one test each. Default is %default.')
+    parser.add_option('-d', '--depth', type='int', default=4,
+                      help='Nest packages DEPTH folders deep. '
+                           'Default is %default.')
+    parser.add_option('-j', '--jobs', type='int', default=1,
+                      help='Run test modules in JOBS processes. '
+                           'Default is %default.')
+    parser.add_option('-r', '--repeat', type='int', default=3,
+                      help='Time each measurement REPEAT times and keep the '
+                           'best. Default is %default.')
+    parser.add_option('-o', '--output', default='benchmark.json',
+                      help='Write the results to OUTPUT. '
+                           'Default is %default.')
+    parser.add_option('-b', '--baseline',
+                      help='Compare the results with those in BASELINE, an '
+                           'earlier OUTPUT, and exit with status 1 if any '
+                           'got worse by more than TOLERANCE.')
+    parser.add_option('--tolerance', type='float', default=0.2,
+                      help='The fraction a measurement may get worse '
+                           'without counting as a regression. '
+                           'Default is %default.')
+    parser.add_option('--min-seconds', type='float', default=0.005,
+                      help='Timings that got worse by less than MIN_SECONDS '
+                           'do not count as regressions, since such small '
+                           'timings vary from run to run. '
+                           'Default is %default.')
+    (options, args) = parser.parse_args()
+    return options
+
+if __name__ == "__main__":
+    run_all()
@@ -35,9 +35,40 @@ import time
 import multiprocessing
 import fnmatch
 import functools
+import threading
+import select
+import socket
+import ast
+import errno
+import struct
+import hashlib
+import json
+import cProfile
+import pstats
+try:
+    import sqlite3
+except ImportError:  # Python built without it
+    sqlite3 = None
+import mmap
+import atexit
+import inspect
+import shutil
+import tempfile
+from xml.sax.saxutils import escape as xml_escape, quoteattr
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 ON_PYTHON3 = sys.version_info[0] == 3
 ON_WINDOWS = platform.system() == "Windows"
+ON_LINUX = platform.system() == "Linux"
+
+# Folder, below the monitored folder, where pytddmon keeps its caches
+CACHE_FOLDER = '.pytddmon_cache'
+
+# Files with a [pytddmon] section of settings, in order of precedence
+CONFIG_FILES = ('setup.cfg', 'tox.ini')
 
 
 ####
@@ -52,86 +83,904 @@ class Pytddmon:
             file_finder,
             monitor,
             project_name="<pytddmon>",
-            pulse_disabled=False
+            pulse_disabled=False,
+            pool_factory=None,
+            jobs=1,
+            import_graph=None,
+            result_cache=None,
+            failures_first=False,
+            fail_fast=False,
+            debounce=0.0,
+            slowest=10,
+            result_writer=None,
+            max_log_size=None,
+            import_profile_path=None,
+            run_profiles=None,
+            history=None,
+            failures_only=False
     ):
         self.file_finder = file_finder
         self.project_name = project_name
         self.monitor = monitor
         self.pulse_disabled = pulse_disabled
+        self.pool_factory = pool_factory or PoolFactory()
+        self.jobs = jobs
+        self.durations = {}  # file path -> seconds, from earlier runs
+        self.import_graph = import_graph  # set to run tests selectively
+        if import_graph is not None:
+            import_graph.importers(self.file_finder())
+        self.results = {}  # file path -> (module, green, total, log)
+        self.result_cache = result_cache
+        self.failures_first = failures_first
+        self.failures_only = failures_only  # no full run while they fail
+        self.fail_fast = fail_fast
+        self.failed_tests = {}  # file path -> ids of tests failing last run
+        self.failures_in_run = {}  # the same, for the run in progress
+        self.new_failure_file = None
+        self.slowest = slowest  # how many slowest tests and files to report
+        self.min_shard_seconds = 1.0  # split longer files, with --jobs
+        self.result_writer = result_writer  # gets the results as they come
+        self.rerunning_failures = False
+        self.spool_folder = None
+        self.import_profile_path = import_profile_path  # set to profile
+        self.import_profile = ImportProfile()
+        self.run_profiles = run_profiles  # set to profile tests
+        self.profile_folder = None  # of the run in progress
+        self.test_durations = {}  # file path -> {test id: seconds}
+        self.test_durations_in_run = {}  # the same, for the run in progress
+        self.timings = {}  # file path -> {'import': seconds, ...}
+        self.history = history  # set to keep the results of every run
+        self.test_outcomes_in_run = []  # (test id, file, outcome, seconds)
+        if history is not None:
+            self.durations, self.test_durations = history.latest_durations()
+        self.debouncer = Debouncer(debounce)
+        self.cancelled = False
+        self.cancel_requested = threading.Event()
+        self.look_during_run = True  # False when others look for changes
+        self.last_look_during_run = 0
+        self.changed_files = None
         self.change_detected = False
+        self.on_progress = None  # called with each test event during runs
+        self.tests_passed_so_far = 0
+        self.tests_run_so_far = 0
 
         self.total_tests_run = 0
         self.total_tests_passed = 0
         self.last_test_run_time = -1
-        self.log = ""
+        self.max_log_size = max_log_size
+        self.log = RunLog(max_log_size)
         self.status_message = 'n/a'
 
         self.run_tests()
 
-    def run_tests(self):
-        """Runs all tests and updates state variables with results."""
+    def run_tests(self, changed_files=None):
+        """Runs tests and updates state variables with results.
 
-        file_paths = self.file_finder()
+        Without changed_files, or when not running selectively, all tests
+        are run. Otherwise only the test files affected by the changed files
+        (and files never run before) are run, and the results of the other
+        files are kept from earlier runs."""
+
+        all_file_paths = set(self.file_finder())
+        file_paths = self.schedule(
+            self.select_files(all_file_paths, changed_files)
+        )
+        for file_path in set(self.results) - all_file_paths:
+            del self.results[file_path]
+            self.test_durations.pop(file_path, None)
+            self.timings.pop(file_path, None)
+        selected_count = len(file_paths)
+        cache_keys = {}
+        if self.result_cache is not None:
+            file_paths, cache_keys = self.reuse_cached_results(file_paths)
 
         # We need to run the tests in a separate process, since
         # Python caches loaded modules, and unittest/doctest
         # imports modules to run them.
-        # However, we do not want to assume users' unit tests
-        # are thread-safe, so we only run one test module at a
-        # time, using processes = 1.
+        # We do not want to assume users' unit tests are
+        # thread-safe, but each worker is a process of its own,
+        # so running several test modules at a time (--jobs)
+        # only assumes the modules do not share outside state,
+        # like files or databases. The default is one at a time.
         start = time.time()
-        if file_paths:
-            pool = multiprocessing.Pool(processes=1)
-            results = pool.map(run_tests_in_file, file_paths)
-            pool.close()
-            pool.join()
-        else:
-            results = []
+        self.cancelled = False
+        if self.run_profiles is not None:
+            self.profile_folder = self.run_profiles.start_run()
+        still_failing = {}
+        if self.failures_first:
+            still_failing = self.rerun_failing_tests(file_paths)
+            if not self.failures_only:
+                still_failing = {}
+        if still_failing:
+            self.keep_failing_results(still_failing)
+            file_paths = []
+        self.count_tests_so_far(file_paths)
+        self.failures_in_run = {}
+        self.test_durations_in_run = {}
+        self.test_outcomes_in_run = []
+        self.new_failure_file = None
+        self.import_profile = ImportProfile()
+        finished = set()
+        if file_paths and not self.cancelled:
+            jobs, shard_counts = self.make_jobs(file_paths)
+            shard_results = {}  # file path -> [(result, info)] of its shards
+            for file_path, result, info in self.run_jobs(jobs):
+                self.import_profile.add(info.pop('imports', {}))
+                shard_results.setdefault(file_path, []).append((result, info))
+                if len(shard_results[file_path]) < \
+                        shard_counts.get(file_path, 1):
+                    continue
+                result, info = merge_shard_results(shard_results.pop(file_path))
+                finished.add(file_path)
+                self.durations[file_path] = info['duration']
+                self.timings[file_path] = info
+                if self.result_writer is not None:
+                    self.result_writer.write_file(file_path, result, info)
+                self.results[file_path] = result
+                (_module, green, total, _log) = result
+                partial = self.fail_fast and green != total
+                if file_path in cache_keys and not partial:
+                    self.result_cache.put(cache_keys[file_path], result)
+        for file_path in finished:
+            self.failed_tests[file_path] = \
+                self.failures_in_run.get(file_path, set())
+            self.test_durations[file_path] = \
+                self.test_durations_in_run.get(file_path, {})
+        if self.result_cache is not None:
+            self.result_cache.save()
+        self.clean_spool_folder()
+        if self.profile_folder is not None:
+            self.profile_folder = self.run_profiles.finish_run()
+        results = sorted(self.results.values(), key=lambda result: result[0])
         self.last_test_run_time = time.time() - start
 
-        now = time.strftime("%H:%M:%S", time.localtime())
-        self.log = ""
-        self.log += "Monitoring folder %s.\n" % self.project_name
-        self.log += "Found <TOTALTESTS> tests in %i files.\n" % len(results)
-        self.log += "Last change detected at %s.\n" % now
-        self.log += "Test run took %.2f seconds.\n" % self.last_test_run_time
-        self.log += "\n"
         self.total_tests_passed = 0
         self.total_tests_run = 0
-        module_logs = []  # Summary for each module with errors first
-        for packed in results:
-            (module, green, total, logtext) = packed
+        for (_module, green, total, _log) in results:
             self.total_tests_passed += green
             self.total_tests_run += total
-            module_log = "\nLog from " + module + ":\n" + logtext
-            if not isinstance(total, int) or total - green > 0:
-                module_logs.insert(0, module_log)
-            else:
-                module_logs.append(module_log)
-        self.log += ''.join(module_logs)
-        self.log = self.log.replace('<TOTALTESTS>',
-                                    str(int(self.total_tests_run.real)))
+
+        if self.history is not None and finished:
+            self.history.record(
+                start,
+                self.last_test_run_time,
+                changed_files,
+                self.cancelled,
+                self.total_tests_passed,
+                self.total_tests_run,
+                [(file_path, self.results[file_path],
+                  self.durations[file_path]) for file_path in finished],
+                self.test_outcomes_in_run
+            )
+
+        now = time.strftime("%H:%M:%S", time.localtime())
+        log = RunLog(self.max_log_size)
+        log.add_line("Monitoring folder %s." % self.project_name)
+        log.add_line("Found %i tests in %i files." % (
+            int(self.total_tests_run.real), len(results)))
+        if selected_count < len(results):
+            log.add_line("Ran tests in %i affected files." % selected_count)
+        if len(file_paths) < selected_count:
+            log.add_line("Reused cached results for %i files." % (
+                selected_count - len(file_paths)))
+        if still_failing and not self.cancelled:
+            log.add_line("Tests that failed in the previous run still fail in "
+                         "%i files, so the other tests were not run." % (
+                             len(still_failing)))
+        elif self.cancelled:
+            log.add_line("Cancelled since files changed during the run. "
+                         "Results of %i files are from earlier runs." % (
+                             len(file_paths) - len(finished)))
+        elif len(finished) < len(file_paths):
+            log.add_line("Stopped at the first new failure, in %s. "
+                         "Results of %i files are from earlier runs." % (
+                             self.new_failure_file,
+                             len(file_paths) - len(finished)))
+        log.add_line("Last change detected at %s." % now)
+        log.add_line("Test run took %.2f seconds." % self.last_test_run_time)
+        log.add_text(self.get_slowest_report())
+        if self.profile_folder is not None:
+            log.add_line("Profile of the tests matching %s written to %s." % (
+                self.run_profiles.pattern, self.profile_folder))
+        if self.import_profile_path is not None:
+            log.add_text(self.import_profile.report())
+            write_file_atomically(
+                self.import_profile_path,
+                json.dumps(self.import_profile.to_json(), indent=1)
+            )
+        for result in results:
+            log.add_module(*result)
+        self.log = log
         self.status_message = now
 
+    def count_tests_so_far(self, file_paths):
+        """Starts counting the tests of a run, from the results of the files
+        that will not run again"""
+        self.tests_passed_so_far = 0
+        self.tests_run_so_far = 0
+        running = set(file_paths)
+        for file_path, (_module, green, total, _log) in self.results.items():
+            if file_path not in running:
+                self.tests_passed_so_far += green
+                self.tests_run_so_far += total
+
+    def get_slowest_tests(self):
+        """returns (seconds, test id) of the slowest tests, slowest first"""
+        durations = [
+            (duration, test_id)
+            for test_durations in self.test_durations.values()
+            for test_id, duration in test_durations.items()
+        ]
+        return sorted(durations, reverse=True)[:self.slowest]
+
+    def get_slowest_files(self):
+        """returns (seconds, file path, timings) of the slowest test files,
+        slowest first. The timings tell how long importing the module,
+        collecting its tests and running them took."""
+        durations = [
+            (timings['duration'], file_path, timings)
+            for file_path, timings in self.timings.items()
+        ]
+        durations.sort(key=lambda duration: duration[:2], reverse=True)
+        return durations[:self.slowest]
+
+    def get_slowest_report(self):
+        """The slowest tests and test files, for the log"""
+        report = ""
+        slowest_tests = self.get_slowest_tests()
+        if slowest_tests:
+            report += "\nSlowest tests:\n"
+            for duration, test_id in slowest_tests:
+                report += "  %.3fs %s\n" % (duration, test_id)
+        slowest_files = self.get_slowest_files()
+        if slowest_files:
+            report += "\nSlowest test files (import + collect + run):\n"
+            for duration, file_path, timings in slowest_files:
+                report += "  %.3fs %s (%.3f + %.3f + %.3f)\n" % (
+                    duration, file_path, timings.get('import', 0.0),
+                    timings.get('collect', 0.0), timings.get('execute', 0.0))
+        return report
+
+    def rerun_failing_tests(self, file_paths):
+        """Runs only the tests of file_paths that failed in the last run,
+        before running everything, so that it shows as soon as possible
+        whether they pass now. Returns the results of the files where some
+        still fail."""
+        jobs = [
+            (file_path, sorted(self.failed_tests[file_path]), False, None)
+            for file_path in file_paths if self.failed_tests.get(file_path)
+        ]
+        if not jobs:
+            return {}
+        self.count_tests_so_far([])
+        for _file_path, test_ids, _fail_fast, _excluded_ids in jobs:
+            self.tests_run_so_far -= len(test_ids)
+        self.failures_in_run = {}
+        self.new_failure_file = None
+        self.rerunning_failures = True
+        still_failing = {}
+        try:
+            for file_path, result, _info in self.run_jobs(jobs):
+                (_module, green, total, _log) = result
+                if green != total:
+                    still_failing[file_path] = result
+        finally:
+            self.rerunning_failures = False
+        return still_failing
+
+    def keep_failing_results(self, still_failing):
+        """With failures_only, the rest of the tests are not run while some
+        of those failing in the last run still fail. Their files get the log
+        of the new failures, and the other tests count as they did before."""
+        for file_path, result in still_failing.items():
+            (module, green, total, log) = result
+            previous = self.results.get(file_path)
+            if previous is not None:
+                (_module, _green, previous_total, _log) = previous
+                green = previous_total - (total - green)
+                total = previous_total
+            self.results[file_path] = (module, green, total, log)
+            self.failed_tests[file_path] = \
+                self.failures_in_run.get(file_path, set())
+
+    def make_jobs(self, file_paths):
+        """Makes the jobs to run the tests of file_paths, which are ordered
+        slowest first. When running several jobs at a time, a file whose tests
+        took more than min_shard_seconds in the last run is split into
+        shards, that each run a part of its tests, balanced by their
+        durations. The first shard runs the tests not given to the others,
+        so that tests added since the last run run too. Returns the jobs,
+        slowest first, and the number of shards of each split file."""
+        jobs = []  # (order, job)
+        shard_counts = {}
+        for position, file_path in enumerate(file_paths):
+            durations = self.test_durations.get(file_path, {})
+            count = 1
+            if self.jobs > 1 and durations:
+                count = min(
+                    self.jobs,
+                    len(durations),
+                    int(sum(durations.values()) / self.min_shard_seconds)
+                )
+            if count <= 1:
+                jobs.append(((position, 0.0), (
+                    file_path, None, self.fail_fast, None)))
+                continue
+            shards = [[0.0, []] for _ in range(count)]
+            slowest_first = sorted(
+                durations.items(), key=lambda item: (-item[1], item[0]))
+            for test_id, duration in slowest_first:
+                shard = min(shards, key=lambda shard: shard[0])
+                shard[0] += duration
+                shard[1].append(test_id)
+            others = sorted(
+                test_id for _seconds, test_ids in shards[1:]
+                for test_id in test_ids)
+            jobs.append(((position, -shards[0][0]), (
+                file_path, None, self.fail_fast, others)))
+            for seconds, test_ids in shards[1:]:
+                jobs.append(((position, -seconds), (
+                    file_path, sorted(test_ids), self.fail_fast, None)))
+            shard_counts[file_path] = count
+        return [job for _order, job in sorted(jobs)], shard_counts
+
+    def run_jobs(self, jobs):
+        """Runs (file path, test ids, fail fast, excluded test ids) jobs in a
+        new pool of worker processes and yields (file path, result, info) as
+        they finish"""
+        event_queue = self.pool_factory.queue()
+        pool = self.pool_factory(
+            processes=min(self.jobs, len(jobs)),
+            initializer=start_event_stream,
+            initargs=(
+                event_queue,
+                self.get_spool_folder(),
+                self.result_writer is not None,
+                self.import_profile_path is not None,
+                self.run_profiles and self.run_profiles.pattern,
+                self.profile_folder
+            )
+        )
+        results = pool.imap_unordered(run_job, jobs)
+        for result in self.wait_for_results(results, len(jobs), event_queue):
+            yield result
+        if self.new_failure_file is None and not self.cancelled:
+            pool.close()
+            pool.join()
+            self.handle_events(event_queue, timeout=0)
+        else:
+            pool.terminate()
+            pool.join()
+
+    def get_spool_folder(self):
+        """The folder where workers leave long logs, see SpooledLog.
+        Created on first use, and removed when pytddmon exits."""
+        if self.spool_folder is None:
+            self.spool_folder = tempfile.mkdtemp(prefix='pytddmon_spool_')
+            atexit.register(shutil.rmtree, self.spool_folder, True)
+        return self.spool_folder
+
+    def clean_spool_folder(self):
+        """removes the spool files that neither a result nor the log shown
+        refer to anymore"""
+        if self.spool_folder is None:
+            return
+        logs = [log for (_module, _green, _total, log) in self.results.values()]
+        logs.extend(self.log.module_logs())
+        in_use = set(log.path for log in logs if isinstance(log, SpooledLog))
+        for name in os.listdir(self.spool_folder):
+            path = os.path.join(self.spool_folder, name)
+            if path not in in_use:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def wait_for_results(self, results, count, event_queue):
+        """Yields count results as the workers finish them, handling the
+        test events sent by the workers while waiting. With fail_fast, stops
+        after the result of the file with the first new failure. When
+        debouncing, stops as soon as files change."""
+        received = set()
+        while count:
+            self.handle_events(event_queue)
+            if self.new_failure_file in received:
+                return
+            if self.changes_during_run():
+                self.cancelled = True
+                return
+            while count:
+                try:
+                    result = results.next(timeout=0)
+                except multiprocessing.TimeoutError:
+                    break
+                count -= 1
+                received.add(result[0])
+                yield result
+
+    def changes_during_run(self):
+        """Should the run be cancelled? It should when cancel_requested is
+        set, or, when debouncing and looking for changes during runs, if
+        files changed. Changes are looked for at most every half second, and
+        collected by the debouncer for the next run."""
+        if self.cancel_requested.is_set():
+            return True
+        if not self.debouncer.quiet_period or not self.look_during_run:
+            return False
+        now = time.time()
+        if now - self.last_look_during_run < 0.5:
+            return False
+        self.last_look_during_run = now
+        return self.note_changes()
+
+    def handle_events(self, event_queue, timeout=0.05):
+        """Handles all pending test events, waiting up to timeout seconds for
+        the first one"""
+        try:
+            event = event_queue.get(timeout=timeout)
+            while True:
+                self.handle_event(event)
+                event = event_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def handle_event(self, event):
+        """Updates the counts of the running test run, notes failing tests,
+        and tells on_progress"""
+        if event['outcome'] != 'started':
+            self.tests_run_so_far += 1
+            if event['outcome'] not in ('failed', 'error'):
+                self.tests_passed_so_far += 1
+        if self.result_writer is not None and not self.rerunning_failures \
+                and event['outcome'] != 'started':
+            self.result_writer.write_test(event)
+        if self.history is not None and not self.rerunning_failures \
+                and event['outcome'] != 'started':
+            self.test_outcomes_in_run.append((
+                event['test'], event['file'], event['outcome'],
+                event.get('duration') or 0.0))
+        if event.get('duration') is not None:
+            self.test_durations_in_run.setdefault(
+                event['file'], {})[event['test']] = event['duration']
+        if event['outcome'] in ('failed', 'error'):
+            file_path = event['file']
+            self.failures_in_run.setdefault(file_path, set()).add(event['test'])
+            known = self.failed_tests.get(file_path, ())
+            if self.fail_fast and self.new_failure_file is None and \
+                    event['test'] not in known:
+                self.new_failure_file = file_path
+        if self.on_progress is not None:
+            self.on_progress(event)
+
+    def select_files(self, file_paths, changed_files):
+        """Picks the test files that need to run after changed_files changed"""
+        if self.import_graph is None or changed_files is None:
+            return file_paths
+        never_run = set(file_paths) - set(self.results)
+        return never_run | self.import_graph.affected(file_paths, changed_files)
+
+    def reuse_cached_results(self, file_paths):
+        """Takes the results from the result cache where possible, returns
+        the file paths still to run and a dict with their cache keys"""
+        to_run = []
+        cache_keys = {}
+        for file_path in file_paths:
+            key = self.result_cache.key(file_path)
+            result = self.result_cache.get(key)
+            if result is None:
+                to_run.append(file_path)
+                cache_keys[file_path] = key
+            else:
+                self.results[file_path] = result
+                if self.result_writer is not None:
+                    self.result_writer.write_file(
+                        file_path, result, {'cached': True})
+        return to_run, cache_keys
+
+    def schedule(self, file_paths):
+        """Orders file paths slowest first, using durations of earlier runs.
+        Files never run before go first, since they may be slow too."""
+        def slowest_first(file_path):
+            if file_path not in self.durations:
+                return (0, 0.0, file_path)
+            return (1, -self.durations[file_path], file_path)
+        return sorted(file_paths, key=slowest_first)
+
+    def note_changes(self):
+        """Looks for changes and collects them in the debouncer, returns True
+        if there were any"""
+        if not self.monitor.look_for_changes():
+            return False
+        self.debouncer.add(getattr(self.monitor, 'changed_files', None))
+        return True
+
     def get_and_set_change_detected(self):
-        self.change_detected = self.monitor.look_for_changes()
+        """Looks for changes. Returns True when it is time to run the tests,
+        that is when there are changes and no new change has been seen for
+        the debounce period."""
+        self.note_changes()
+        self.change_detected = self.debouncer.is_quiet()
+        self.changed_files = None
+        if self.change_detected:
+            self.changed_files = self.debouncer.take()
         return self.change_detected
 
     def main(self):
         """This is the main loop body"""
-        self.change_detected = self.monitor.look_for_changes()
-        if self.change_detected:
-            self.run_tests()
+        if self.get_and_set_change_detected():
+            self.run_tests(self.changed_files)
 
     def get_log(self):
         """Access the log string created during test run"""
-        return self.log
+        return self.log.render()
 
     def get_status_message(self):
         """Return message in status bar"""
         return self.status_message
 
 
+class RunLog:
+    """The log of a test run: a header, and a section with the log of each
+    test module, failing modules first. The text is only put together when
+    asked for, and then kept. Module logs longer than max_section_size
+    characters keep just their start and end, and modules that do not fit in
+    max_size characters are left out."""
+
+    max_size = 1000000
+    max_section_size = 20000
+
+    def __init__(self, max_size=None, max_section_size=None):
+        if max_size is not None:
+            self.max_size = max_size
+        if max_section_size is not None:
+            self.max_section_size = max_section_size
+        self.header = []
+        self.failing = []  # (module, log)
+        self.passing = []
+        self.text = None
+
+    def add_line(self, line):
+        self.add_text(line + "\n")
+
+    def add_text(self, text):
+        self.header.append(text)
+        self.text = None
+
+    def add_module(self, module, green, total, log):
+        if total.imag or green < total:
+            self.failing.append((module, log))
+        else:
+            self.passing.append((module, log))
+        self.text = None
+
+    def module_logs(self):
+        """the logs of the modules, as added"""
+        return [log for _module, log in self.failing + self.passing]
+
+    def sections(self):
+        """yields (module, log, failing) for each module, failing first"""
+        for module, log in self.failing:
+            yield module, self.shorten(log_text(log)), True
+        for module, log in self.passing:
+            yield module, self.shorten(log_text(log)), False
+
+    def shorten(self, log):
+        if len(log) <= self.max_section_size:
+            return log
+        keep = self.max_section_size // 2
+        return "%s\n... %i characters left out ...\n%s" % (
+            log[:keep], len(log) - 2 * keep, log[-keep:])
+
+    def get_header(self):
+        return ''.join(self.header) + "\n"
+
+    def visible_sections(self):
+        """returns the (module, log, failing) sections that fit in max_size
+        characters, and a note about those left out ('' if none are)"""
+        size = len(self.get_header())
+        visible = []
+        left_out = 0
+        for module, log, failing in self.sections():
+            size += len(section_title(module)) + len(log)
+            if left_out or size > self.max_size:
+                left_out += 1
+            else:
+                visible.append((module, log, failing))
+        note = ""
+        if left_out:
+            note = "\n... the logs of %i more modules are left out, " \
+                   "the log is limited to %i characters.\n" % (
+                       left_out, self.max_size)
+        return visible, note
+
+    def render(self):
+        if self.text is None:
+            sections, note = self.visible_sections()
+            parts = [self.get_header()]
+            for module, log, _failing in sections:
+                parts.append(section_title(module) + log)
+            parts.append(note)
+            self.text = ''.join(parts)
+        return self.text
+
+    def __str__(self):
+        return self.render()
+
+
+def section_title(module):
+    return "\nLog from " + module + ":\n"
+
+
+class ImportProfile:
+    """The import times of the modules imported by the workers of a test
+    run, see ImportTimer. A module imported by several workers counts
+    each time."""
+
+    min_seconds = 0.001  # faster imports are left out of the report
+
+    def __init__(self):
+        self.modules = {}  # module name -> [cumulative, self, count, parent]
+
+    def add(self, timings):
+        for name, (cumulative, own, parent) in timings.items():
+            if name in self.modules:
+                module = self.modules[name]
+                module[0] += cumulative
+                module[1] += own
+                module[2] += 1
+            else:
+                self.modules[name] = [cumulative, own, 1, parent]
+
+    def children(self):
+        """returns the module names imported by each module, slowest first,
+        with None for those imported directly by the workers"""
+        children = {}
+        for name, (_cumulative, _own, _count, parent) in self.modules.items():
+            if parent not in self.modules:
+                parent = None
+            children.setdefault(parent, []).append(name)
+        for names in children.values():
+            names.sort(key=lambda name: (-self.modules[name][0], name))
+        return children
+
+    def report(self):
+        """The modules as a tree, for the log"""
+        if not self.modules:
+            return "\nNo imports were timed.\n"
+        lines = ["\nImport times in seconds (cumulative, self, module):\n"]
+        children = self.children()
+        left_out = 0
+        pending = [(name, 0) for name in reversed(children.get(None, []))]
+        while pending:
+            name, depth = pending.pop()
+            cumulative, own, count, _parent = self.modules[name]
+            if cumulative < self.min_seconds:
+                left_out += 1
+                continue
+            lines.append("  %8.3f %8.3f  %s%s%s\n" % (
+                cumulative, own, '  ' * depth, name,
+                ' (%i times)' % count if count > 1 else ''))
+            pending.extend(
+                (child, depth + 1) for child in reversed(children.get(name, [])))
+        if left_out:
+            lines.append("  (%i imports faster than %.3f seconds not shown)\n" % (
+                left_out, self.min_seconds))
+        return ''.join(lines)
+
+    def to_json(self):
+        """The modules, slowest first, for the JSON report"""
+        return [
+            {
+                'module': name,
+                'cumulative': cumulative,
+                'self': own,
+                'count': count,
+                'imported_by': parent,
+            }
+            for name, (cumulative, own, count, parent) in sorted(
+                self.modules.items(), key=lambda item: (-item[1][0], item[0]))
+        ]
+
+
+class RunProfiles:
+    """Keeps the profiles of the tests matching pattern for the last max_runs
+    test runs, each in a folder of its own below folder, named by the time
+    of the run. The workers leave a profile for each job in the folder of
+    the run; they are merged into profile.pstats, for pstats or snakeviz,
+    and profile.collapsed, collapsed stacks for flamegraph.pl or
+    speedscope."""
+
+    max_runs = 20
+    worker_suffix = '.worker.pstats'
+
+    def __init__(self, folder, pattern):
+        self.folder = folder
+        self.pattern = pattern
+        self.run_folder = None
+
+    def start_run(self):
+        """creates and returns the folder for the profiles of a run"""
+        name = time.strftime('%Y%m%d-%H%M%S')
+        self.run_folder = os.path.join(self.folder, name)
+        suffix = 1
+        while os.path.exists(self.run_folder):
+            suffix += 1
+            self.run_folder = os.path.join(self.folder, '%s-%i' % (name, suffix))
+        os.makedirs(self.run_folder)
+        return self.run_folder
+
+    def finish_run(self):
+        """merges the profiles of the workers, and removes the oldest runs.
+        Returns the folder of the run, or None if no test was profiled."""
+        worker_files = sorted(
+            os.path.join(self.run_folder, name)
+            for name in os.listdir(self.run_folder)
+            if name.endswith(self.worker_suffix)
+        )
+        if not worker_files:
+            shutil.rmtree(self.run_folder, ignore_errors=True)
+            return None
+        stats = pstats.Stats(worker_files[0])
+        for worker_file in worker_files[1:]:
+            stats.add(worker_file)
+        stats.dump_stats(os.path.join(self.run_folder, 'profile.pstats'))
+        with open(os.path.join(self.run_folder, 'profile.collapsed'), 'w') \
+                as collapsed:
+            collapsed.writelines(
+                '%s %i\n' % (stack, count)
+                for stack, count in collapsed_stacks(stats.stats))
+        for worker_file in worker_files:
+            os.remove(worker_file)
+        runs = sorted(os.listdir(self.folder))
+        for name in runs[:max(0, len(runs) - self.max_runs)]:
+            shutil.rmtree(os.path.join(self.folder, name), ignore_errors=True)
+        return self.run_folder
+
+
+def collapsed_stacks(stats, max_depth=64):
+    """Makes collapsed stacks ("outer;inner microseconds") of the raw stats
+    of pstats. cProfile only records callers, not whole stacks, so the time
+    of a function called from several places is shared among the stacks in
+    proportion to the time of each call site."""
+    callees = {}  # function -> {callee: cumulative seconds from function}
+    for function, (_cc, _nc, _tt, _ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[function] = edge[3]
+
+    def name(function):
+        file_name, line, function_name = function
+        return '%s:%i(%s)' % (os.path.basename(file_name), line, function_name)
+
+    counts = {}
+    roots = [function for function, stat in stats.items()
+             if not any(caller in stats for caller in stat[4])]
+    pending = [((function,), 1.0) for function in roots]
+    while pending:
+        stack, share = pending.pop()
+        function = stack[-1]
+        own = stats[function][2]
+        key = ';'.join(name(frame) for frame in stack)
+        counts[key] = counts.get(key, 0) + int(own * share * 1e6)
+        if len(stack) >= max_depth:
+            continue
+        for callee, seconds in callees.get(function, {}).items():
+            if callee in stack or callee not in stats:
+                continue
+            callee_cumulative = stats[callee][3]
+            if callee_cumulative:
+                pending.append((
+                    stack + (callee,),
+                    min(1.0, share * seconds / callee_cumulative)
+                ))
+    return sorted(
+        (stack, count) for stack, count in counts.items() if count > 0)
+
+
+class BackgroundRunner:
+    """Runs the tests of a Pytddmon in a thread of its own, so that a user
+    interface stays responsive meanwhile. The test events of the run, and its
+    end, are put in a queue that the user interface takes messages from.
+    The user interface keeps looking for changes during the run."""
+
+    def __init__(self, pytddmon):
+        self.pytddmon = pytddmon
+        self.messages = queue.Queue()
+        self.running = False
+        pytddmon.on_progress = self.when_progress
+        pytddmon.look_during_run = False
+
+    def when_progress(self, event):
+        self.messages.put(('progress', event))
+
+    def start(self, changed_files):
+        """starts running the tests affected by changed_files (all if None)"""
+        self.running = True
+        self.pytddmon.cancel_requested.clear()
+        thread = threading.Thread(target=self.run, args=(changed_files,))
+        thread.daemon = True
+        thread.start()
+
+    def run(self, changed_files):
+        try:
+            self.pytddmon.run_tests(changed_files)
+        finally:
+            self.messages.put(('done', None))
+
+    def take_messages(self):
+        """returns the ('progress', event) and ('done', None) messages sent
+        so far"""
+        messages = []
+        try:
+            while True:
+                messages.append(self.messages.get_nowait())
+        except queue.Empty:
+            pass
+        if ('done', None) in messages:
+            self.running = False
+        return messages
+
+
+class Debouncer:
+    """Collects the changes of a burst (like a git pull or a refactoring that
+    saves many files) until no new change has been seen for quiet_period
+    seconds, so the burst is tested in one run."""
+
+    def __init__(self, quiet_period, clock=time.time):
+        self.quiet_period = quiet_period
+        self.clock = clock
+        self.last_change = None
+        self.changed_files = set()
+
+    def add(self, changed_files):
+        """notes a change, changed_files is None if it is not known which
+        files changed"""
+        self.last_change = self.clock()
+        if changed_files is None or self.changed_files is None:
+            self.changed_files = None
+        else:
+            self.changed_files.update(changed_files)
+
+    def is_pending(self):
+        """are there changes not taken yet?"""
+        return self.last_change is not None
+
+    def seconds_until_quiet(self):
+        return max(0.0, self.last_change + self.quiet_period - self.clock())
+
+    def is_quiet(self):
+        """are there changes, and has it been quiet long enough since?"""
+        return self.is_pending() and self.seconds_until_quiet() <= 0
+
+    def take(self):
+        """returns all changed files collected (None if unknown) and starts
+        collecting anew"""
+        changed_files = self.changed_files
+        self.last_change = None
+        self.changed_files = set()
+        return changed_files
+
+
+class PollInterval:
+    """How long to wait before looking for changes again: short right after
+    files changed, since more changes tend to follow, then growing while
+    nothing changes, up to maximum seconds."""
+
+    def __init__(self, minimum=0.25, maximum=4.0, factor=1.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.seconds = minimum
+
+    def reset(self):
+        self.seconds = self.minimum
+
+    def back_off(self):
+        self.seconds = min(self.maximum, self.seconds * self.factor)
+
+    def milliseconds(self):
+        return int(self.seconds * 1000)
+
+
 class Monitor:
     """Looks for file changes when prompted to"""
 
@@ -140,6 +989,7 @@ class Monitor:
         self.get_file_size = get_file_size
         self.get_file_modtime = get_file_modtime
         self.snapshot = self.get_snapshot()
+        self.changed_files = set()
 
     def get_snapshot(self):
         snapshot = {}
@@ -151,9 +1001,447 @@ class Monitor:
 
     def look_for_changes(self):
         new_snapshot = self.get_snapshot()
-        change_detected = new_snapshot != self.snapshot
+        self.changed_files = diff_snapshots(self.snapshot, new_snapshot)
         self.snapshot = new_snapshot
-        return change_detected
+        return bool(self.changed_files)
+
+
+def diff_snapshots(old, new):
+    """
+    Returns the files added, removed or modified between two snapshots.
+
+    >>> sorted(diff_snapshots({'a': 1, 'b': 2, 'c': 3}, {'b': 2, 'c': 4, 'd': 5}))
+    ['a', 'c', 'd']
+    """
+    changed = set(old) ^ set(new)
+    for file_path in set(old) & set(new):
+        if old[file_path] != new[file_path]:
+            changed.add(file_path)
+    return changed
+
+
+class ScanningMonitor:
+    """Looks for file changes by scanning the folder tree when prompted to,
+    like Monitor, but incrementally. A folder is only listed again when its
+    modification time changed, which happens when entries are added, removed
+    or renamed in it. Files are stat'ed once per scan. They must be stat'ed on
+    every scan, since editing a file does not touch its folder."""
+
+    # Folders modified this recently are listed again on the next scan, in
+    # case more entries were added within the file system's time resolution.
+    racy_seconds = 2.0
+
+    def __init__(self, file_finder):
+        self.file_finder = file_finder
+        self.folders = {}  # folder path -> (mtime, file names, folder names)
+        self.files = {}  # file path -> (size, mtime)
+        self.changed_files = set()
+        self.scan()
+
+    def look_for_changes(self):
+        self.changed_files = self.scan()
+        return bool(self.changed_files)
+
+    def scan(self):
+        """updates the records of all folders and files, returns the set of
+        files added, removed or modified since the last scan"""
+        changed = set()
+        now = time.time()
+        pending = [self.file_finder.root]
+        while pending:
+            folder = pending.pop()
+            try:
+                mtime = os.stat(folder).st_mtime
+            except OSError:
+                continue
+            cached = self.folders.get(folder)
+            if cached is not None and cached[0] == mtime:
+                stats = {}
+                filenames, subfolders = cached[1], cached[2]
+            else:
+                stats, subfolders = self.read_folder(folder)
+                filenames = frozenset(stats)
+                if cached is not None:
+                    for name in cached[1] - filenames:
+                        path = os.path.join(folder, name)
+                        self.files.pop(path, None)
+                        changed.add(path)
+                    for name in cached[2] - subfolders:
+                        changed.update(
+                            self.forget_tree(os.path.join(folder, name)))
+                if now - mtime < self.racy_seconds:
+                    mtime = None
+                self.folders[folder] = (mtime, filenames, subfolders)
+            pending.extend(os.path.join(folder, name) for name in subfolders)
+            for name in filenames:
+                path = os.path.join(folder, name)
+                stat = stats.get(name)
+                if stat is None:
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                record = (stat.st_size, stat.st_mtime)
+                if self.files.get(path) != record:
+                    self.files[path] = record
+                    changed.add(path)
+        return changed
+
+    def read_folder(self, folder):
+        """lists a folder, returns ({file name: stat}, frozenset of folder
+        names) for the matching files and the folders to descend into"""
+        stats = {}
+        subfolders = set()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            entries = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    if not entry.is_symlink() and \
+                            self.file_finder.wants_folder(entry.path):
+                        subfolders.add(entry.name)
+                elif self.file_finder.wants_file(entry.path):
+                    stats[entry.name] = entry.stat()
+            except OSError:
+                continue
+        return stats, frozenset(subfolders)
+
+    def forget_tree(self, root):
+        """drops the records of root and everything below it, returns the
+        files that were recorded there"""
+        prefix = os.path.join(root, '')
+        for folder in list(self.folders):
+            if folder == root or folder.startswith(prefix):
+                del self.folders[folder]
+        forgotten = set(path for path in self.files if path.startswith(prefix))
+        for path in forgotten:
+            del self.files[path]
+        return forgotten
+
+
+# Flags and event masks from <sys/inotify.h>
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+
+class Inotify:
+    """Minimal ctypes binding to the Linux inotify API"""
+
+    event_header = struct.Struct('iIII')  # wd, mask, cookie, len
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.get_errno = ctypes.get_errno
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            self.raise_error()
+
+    def raise_error(self, path=None):
+        code = self.get_errno()
+        raise OSError(code, os.strerror(code), path)
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, path, mask):
+        """starts watching path, returns the watch descriptor"""
+        if not isinstance(path, bytes):
+            path = encode_file_name(path)
+        wd = self.libc.inotify_add_watch(self.fd, path, mask)
+        if wd < 0:
+            self.raise_error(path)
+        return wd
+
+    def remove_watch(self, wd):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """returns a list of pending (wd, mask, name) events, without
+        blocking"""
+        events = []
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return events
+                raise
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _cookie, length = self.event_header.unpack_from(
+                    buf, offset)
+                offset += self.event_header.size
+                name = buf[offset:offset + length].rstrip(b'\0')
+                offset += length
+                events.append((wd, mask, decode_file_name(name)))
+
+    def close(self):
+        os.close(self.fd)
+
+
+def can_use_inotify():
+    """inotify is available on Linux through the C library"""
+    if not ON_LINUX:
+        return False
+    try:
+        Inotify().close()
+    except (OSError, AttributeError):
+        return False
+    return True
+
+
+def decode_file_name(name):
+    """decodes a file name read from the kernel as os.listdir does, so names
+    that are not valid in the file system encoding do not raise"""
+    if hasattr(os, 'fsdecode'):
+        return os.fsdecode(name)
+    return name  # Python 2 file names are byte strings
+
+
+def encode_file_name(name):
+    if hasattr(os, 'fsencode'):
+        return os.fsencode(name)
+    return name.encode(sys.getfilesystemencoding())
+
+
+class InotifyMonitor:
+    """Looks for file changes using inotify events from the kernel, instead
+    of scanning the file system when prompted to. Reading the pending events
+    costs next to nothing when no file has changed."""
+
+    mask = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+            IN_CREATE | IN_DELETE | IN_ONLYDIR)
+
+    def __init__(self, file_finder, inotify=None):
+        self.file_finder = file_finder
+        self.inotify = inotify or Inotify()
+        self.watches = {}  # watch descriptor -> directory path
+        self.changed_files = set()
+        self.watch_tree(file_finder.root)
+
+    def fileno(self):
+        """the file descriptor that becomes readable when files change"""
+        return self.inotify.fileno()
+
+    def watch_tree(self, root):
+        """watches root and all folders below it, returns the matching files
+        found below root"""
+        found = set()
+        for path, _folders, filenames in self.file_finder.walk(root):
+            try:
+                self.watches[self.inotify.add_watch(path, self.mask)] = path
+            except OSError:
+                continue
+            for filename in filenames:
+                file_path = os.path.join(path, filename)
+                if self.file_finder.wants_file(file_path):
+                    found.add(file_path)
+        return found
+
+    def unwatch_tree(self, root):
+        """stops watching root and all folders below it"""
+        prefix = os.path.join(root, '')
+        for wd, path in list(self.watches.items()):
+            if path == root or path.startswith(prefix):
+                self.inotify.remove_watch(wd)
+                del self.watches[wd]
+
+    def look_for_changes(self):
+        self.changed_files = set()
+        for wd, mask, name in self.inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                self.changed_files.update(self.file_finder())
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_MOVED_FROM | IN_DELETE):
+                    self.unwatch_tree(path)
+                if not self.file_finder.wants_folder(path):
+                    continue
+                self.changed_files.add(path)
+                if mask & (IN_MOVED_TO | IN_CREATE):
+                    self.changed_files.update(self.watch_tree(path))
+            elif self.file_finder.wants_file(path):
+                self.changed_files.add(path)
+        return bool(self.changed_files)
+
+
+class HashingMonitor:
+    """Wraps another monitor, and only reports the changes where the content
+    of the file really changed. Touching a file, or checking out a branch
+    with the same content, is then not a change."""
+
+    def __init__(self, monitor, file_finder, hasher):
+        self.monitor = monitor
+        self.hasher = hasher
+        if hasattr(monitor, 'fileno'):
+            self.fileno = monitor.fileno
+        self.changed_files = set()
+        for file_path in file_finder():
+            hasher.digest(file_path)
+        hasher.save()
+
+    def look_for_changes(self):
+        self.changed_files = set()
+        if self.monitor.look_for_changes():
+            self.changed_files = self.hasher.confirm_changes(
+                self.monitor.changed_files)
+        return bool(self.changed_files)
+
+
+class ContentHasher:
+    """Computes content digests of files. Digests are cached together with
+    the size and modification time of the file, so a file is only read again
+    when its stat changed. The cache is kept in a file, to survive restarts."""
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self.digests = {}  # file path -> [size, mtime, hex digest]
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path) as cache_file:
+                self.digests = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            self.digests = {}
+
+    def save(self):
+        if self.cache_path is None or not self.dirty:
+            return
+        write_file_atomically(self.cache_path, json.dumps(self.digests))
+        self.dirty = False
+
+    def digest(self, file_path):
+        """returns the content digest of file_path, or None if it cannot be
+        read"""
+        try:
+            stat = os.stat(file_path)
+            cached = self.digests.get(file_path)
+            if cached and cached[:2] == [stat.st_size, stat.st_mtime]:
+                return cached[2]
+            content_hash = new_content_hash()
+            with open(file_path, 'rb') as content:
+                for block in iter(lambda: content.read(1 << 16), b''):
+                    content_hash.update(block)
+        except (IOError, OSError):
+            return None
+        digest = content_hash.hexdigest()
+        self.digests[file_path] = [stat.st_size, stat.st_mtime, digest]
+        self.dirty = True
+        return digest
+
+    def confirm_changes(self, file_paths):
+        """returns the file_paths whose content is not the one digested last
+        time. Files that are new, removed or unreadable count as changed."""
+        confirmed = set()
+        for file_path in file_paths:
+            old = self.digests.get(file_path)
+            new_digest = self.digest(file_path)
+            if new_digest is None:
+                if self.digests.pop(file_path, None) is not None:
+                    self.dirty = True
+            if old is None or new_digest is None or new_digest != old[2]:
+                confirmed.add(file_path)
+        self.save()
+        return confirmed
+
+
+def new_content_hash():
+    """returns a hash object, the fastest available: xxhash if installed,
+    otherwise blake2b (Python 3.6+) or sha1"""
+    try:
+        import xxhash
+        return xxhash.xxh64()
+    except ImportError:
+        pass
+    if hasattr(hashlib, 'blake2b'):
+        return hashlib.blake2b(digest_size=16)
+    return hashlib.sha1()
+
+
+def cache_file_path(root, name):
+    """returns the path of a file in pytddmon's cache folder below root,
+    creating the folder if needed"""
+    folder = os.path.join(root, CACHE_FOLDER)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    return os.path.join(folder, name)
+
+
+def write_file_atomically(path, content):
+    """writes content to a temporary file and renames it to path, so that
+    readers never see a half written file"""
+    temporary_path = '%s.%i.tmp' % (path, os.getpid())
+    with open(temporary_path, 'w') as temporary_file:
+        temporary_file.write(content)
+    if ON_WINDOWS and os.path.exists(path):
+        os.remove(path)
+    os.rename(temporary_path, path)
+
+
+class PoolFactory:
+    """Creates the process pool for each test run.
+
+    By default every run starts fresh interpreters. When modules to preload
+    are given and the platform supports it, a long-lived "forkserver" parent
+    imports them once, and the workers of every run are forked from that warm
+    parent instead. User modules are still only imported in the workers, so
+    each run sees fresh code, but the cost of importing stable third-party
+    dependencies is paid once per pytddmon session.
+    """
+
+    def __init__(self, preload=None):
+        self.context = None
+        if preload and can_use_forkserver():
+            self.context = multiprocessing.get_context('forkserver')
+            self.context.set_forkserver_preload(['__main__'] + list(preload))
+            from multiprocessing import forkserver
+            forkserver.ensure_running()
+
+    def __call__(self, processes, initializer=None, initargs=()):
+        context = self.context or multiprocessing
+        return context.Pool(
+            processes=processes,
+            initializer=initializer,
+            initargs=initargs
+        )
+
+    def queue(self):
+        """returns a queue that can be passed to the pool's workers"""
+        return (self.context or multiprocessing).Queue()
+
+
+def can_use_forkserver():
+    """the forkserver start method exists on Python 3.4+ and not on Windows"""
+    if not hasattr(multiprocessing, 'get_all_start_methods'):
+        return False
+    return 'forkserver' in multiprocessing.get_all_start_methods()
+
 
 class Kata:
     ''' Generates a logical unit test template file '''
@@ -179,34 +1467,538 @@ class {1}(unittest.TestCase):
 ####
 
 class FileFinder:
-    """Returns all files matching given regular expression from root downwards"""
+    """Returns all files matching given regular expression from root downwards,
+    except those excluded by glob patterns or .gitignore. Excluded folders are
+    not descended into."""
+
+    # Folders that never contain tests to run
+    default_excludes = [
+        '.git/', '.hg/', '.svn/', '.bzr/', '.tox/', '.nox/', '.eggs/',
+        '*.egg-info/', '__pycache__/', 'node_modules/', CACHE_FOLDER + '/',
+    ]
 
-    def __init__(self, root, regexp):
+    def __init__(self, root, regexp, excludes=(), use_gitignore=False):
         self.root = os.path.abspath(root)
         self.regexp = regexp
+        self.pattern = re.compile('(?:%s)$' % regexp)
+        excludes = self.default_excludes + list(excludes)
+        if use_gitignore:
+            excludes.extend(read_gitignore(self.root))
+        self.file_excludes = ExcludePatterns(
+            [glob for glob in excludes if not glob.endswith('/')])
+        self.folder_excludes = ExcludePatterns(excludes)
 
     def __call__(self):
         return self.find_files()
 
-    def find_files(self):
+    def find_files(self, top=None):
         """recursively finds files matching regexp"""
         file_paths = set()
-        for path, _folder, filenames in os.walk(self.root):
+        for path, _folders, filenames in self.walk(top):
             for filename in filenames:
-                if self.re_complete_match(filename):
-                    file_paths.add(
-                        os.path.abspath(os.path.join(path, filename))
-                    )
+                file_path = os.path.abspath(os.path.join(path, filename))
+                if self.wants_file(file_path):
+                    file_paths.add(file_path)
         return file_paths
 
+    def walk(self, top=None):
+        """like os.walk from top (default root), but skipping excluded
+        folders"""
+        for path, folders, filenames in os.walk(top or self.root):
+            folders[:] = [
+                name for name in folders
+                if self.wants_folder(os.path.join(path, name))
+            ]
+            yield path, folders, filenames
+
+    def wants_folder(self, path):
+        """should files below the folder at path be found? Virtualenvs are
+        never searched."""
+        if self.folder_excludes.match(self.relative_path(path)):
+            return False
+        return not os.path.exists(os.path.join(path, 'pyvenv.cfg'))
+
+    def wants_file(self, path):
+        """should the file at path be found?"""
+        if not self.re_complete_match(os.path.basename(path)):
+            return False
+        return not self.file_excludes.match(self.relative_path(path))
+
+    def relative_path(self, path):
+        """path relative to root, with / as separator"""
+        if path.startswith(self.root + os.sep):
+            path = path[len(self.root) + 1:]
+        else:
+            path = os.path.relpath(path, self.root)
+        return path.replace(os.sep, '/')
+
     def re_complete_match(self, string_to_match):
         """full string regexp check"""
-        return bool(re.match(self.regexp + "$", string_to_match))
+        return bool(self.pattern.match(string_to_match))
+
+
+class ExcludePatterns:
+    """A set of .gitignore style glob patterns, matched against paths relative
+    to the root. Patterns without a slash match the name of a file or folder
+    at any depth, others match the whole relative path. A trailing slash only
+    marks a pattern as a folder pattern, which the caller must sort out."""
+
+    def __init__(self, globs):
+        name_globs = []
+        path_globs = []
+        for glob in globs:
+            glob = glob.rstrip('/')
+            if '/' in glob:
+                path_globs.append(glob.lstrip('/'))
+            elif glob:
+                name_globs.append(glob)
+        self.name_pattern = compile_globs(name_globs)
+        self.path_pattern = compile_globs(path_globs)
+
+    def match(self, relative_path):
+        """
+        >>> patterns = ExcludePatterns(['*.egg-info', '/build', 'docs/*.py'])
+        >>> patterns.match('src/pytddmon.egg-info')
+        True
+        >>> patterns.match('build')
+        True
+        >>> patterns.match('src/build')
+        False
+        >>> patterns.match('docs/conf.py')
+        True
+        """
+        if self.path_pattern and self.path_pattern.match(relative_path):
+            return True
+        name = relative_path.rpartition('/')[2]
+        return bool(self.name_pattern and self.name_pattern.match(name))
+
+
+def compile_globs(globs):
+    """compiles glob patterns into one regular expression, None if there are
+    no patterns"""
+    if not globs:
+        return None
+    return re.compile('|'.join(
+        '(?:%s)' % fnmatch.translate(glob) for glob in globs))
+
+
+def read_gitignore(root):
+    """returns the patterns in root's .gitignore. Negated patterns ("!") are
+    not supported and left out."""
+    try:
+        with open(os.path.join(root, '.gitignore')) as gitignore:
+            lines = gitignore.read().splitlines()
+    except (IOError, OSError):
+        return []
+    return [
+        line.strip() for line in lines
+        if line.strip() and not line.startswith(('#', '!'))
+    ]
 
 
 wildcard_to_regex = fnmatch.translate
 
 
+####
+## Finding dependencies
+####
+
+class ImportGraph:
+    """Knows which files below root a Python file imports, by parsing the
+    import statements of the files. Parse results are cached until the
+    file's size or modification time changes."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.imports = {}  # file path -> (stamp, set of imported file paths)
+
+    def direct_imports(self, file_path):
+        """returns the files below root that file_path imports"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return set()
+        stamp = (stat.st_size, stat.st_mtime)
+        cached = self.imports.get(file_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        package = file_name_to_module(self.root, file_path)
+        if os.path.basename(file_path) != '__init__.py':
+            package = package.rpartition('.')[0]
+        imported = set()
+        for module_name in imported_module_names(file_path, package):
+            imported.update(self.module_to_files(module_name))
+        imported.discard(file_path)
+        self.imports[file_path] = (stamp, imported)
+        return imported
+
+    def module_to_files(self, module_name):
+        """returns the files below root that importing module_name loads,
+        including the __init__.py of its packages"""
+        files = []
+        words = module_name.split('.')
+        for length in range(1, len(words) + 1):
+            path = os.path.join(self.root, *words[:length])
+            for candidate in (path + '.py', os.path.join(path, '__init__.py')):
+                if os.path.isfile(candidate):
+                    files.append(candidate)
+        return files
+
+    def transitive_imports(self, file_path):
+        """returns the files below root that file_path imports, directly or
+        through other files"""
+        found = set()
+        pending = [file_path]
+        while pending:
+            for imported in self.direct_imports(pending.pop()):
+                if imported not in found:
+                    found.add(imported)
+                    pending.append(imported)
+        found.discard(file_path)
+        return found
+
+    def importers(self, file_paths):
+        """returns {file path: set of files importing it} for the files that
+        file_paths import, directly or transitively. Parsing them all up
+        front, as pytddmon does at startup, means that a module deleted later
+        is still known to be imported by the files that import it."""
+        importers = {}
+        pending = list(file_paths)
+        seen = set(pending)
+        while pending:
+            file_path = pending.pop()
+            for imported in self.direct_imports(file_path):
+                importers.setdefault(imported, set()).add(file_path)
+                if imported not in seen:
+                    seen.add(imported)
+                    pending.append(imported)
+        return importers
+
+    def affected(self, file_paths, changed_files):
+        """returns the file_paths that are, or directly or transitively
+        import, any of changed_files. A changed folder, like one renamed or
+        removed, stands for all the files known below it."""
+        importers = self.importers(file_paths)
+        hit = set(changed_files)
+        folders = tuple(os.path.join(path, '') for path in changed_files)
+        hit.update(path for path in set(importers) | set(file_paths)
+                   if path.startswith(folders))
+        pending = list(hit)
+        while pending:
+            for importer in importers.get(pending.pop(), ()):
+                if importer not in hit:
+                    hit.add(importer)
+                    pending.append(importer)
+        return set(file_paths) & hit
+
+
+def imported_module_names(file_path, package):
+    """Lists the absolute names of all modules a file imports, anywhere in the
+    file. For "from x import y", both x and x.y are listed since y may be a
+    module. Files that cannot be parsed import nothing."""
+    try:
+        with open(file_path, 'rb') as source_file:
+            tree = ast.parse(source_file.read(), file_path)
+    except (SyntaxError, ValueError, TypeError, IOError):
+        return []
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ''
+            if node.level:
+                words = package.split('.') if package else []
+                words = words[:max(0, len(words) - (node.level - 1))]
+                base = '.'.join(words + ([base] if base else []))
+            if base:
+                names.append(base)
+            names.extend(
+                base + '.' + alias.name if base else alias.name
+                for alias in node.names
+            )
+    return names
+
+
+####
+## Caching test results
+####
+
+class ResultCache:
+    """Keeps the results of test files in a folder, one file per result,
+    keyed by the content of the test file and of all files below root that it
+    imports. A test file whose key is found does not need to run again.
+
+    Results with errors are not cached. When the folder grows bigger than
+    max_bytes, the results used least recently are removed."""
+
+    def __init__(self, folder, hasher, import_graph, max_bytes=50 * 1024 ** 2):
+        self.folder = folder
+        self.hasher = hasher
+        self.import_graph = import_graph
+        self.max_bytes = max_bytes
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+
+    def key(self, file_path):
+        """returns the cache key for the current content of file_path and its
+        imports, or None if some file cannot be read"""
+        key_hash = hashlib.sha1(sys.version.encode('utf-8'))
+        dependencies = self.import_graph.transitive_imports(file_path)
+        for path in [file_path] + sorted(dependencies):
+            digest = self.hasher.digest(path)
+            if digest is None:
+                return None
+            key_hash.update(('%s:%s\n' % (path, digest)).encode('utf-8'))
+        return key_hash.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.folder, key + '.json')
+
+    def get(self, key):
+        """returns the (module, green, total, log) stored for key, or None"""
+        if key is None:
+            return None
+        path = self.entry_path(key)
+        try:
+            with open(path) as entry:
+                module, green, total, log = json.load(entry)
+            os.utime(path, None)  # marks the entry as recently used
+        except (IOError, OSError, ValueError):
+            return None
+        return module, green, total, log
+
+    def put(self, key, result):
+        (module, green, total, log) = result
+        if key is None or not isinstance(total, int):
+            return
+        write_file_atomically(
+            self.entry_path(key),
+            json.dumps([module, green, total, log_text(log)])
+        )
+
+    def save(self):
+        """persists the digests and evicts entries used least recently,
+        until the folder is smaller than max_bytes"""
+        self.hasher.save()
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.folder):
+            try:
+                stat = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total_size += stat.st_size
+        entries.sort()
+        while entries and total_size > self.max_bytes:
+            _mtime, size, name = entries.pop(0)
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                pass
+            total_size -= size
+
+
+####
+## Run history
+####
+
+class RunHistory:
+    """Keeps the results of every test run in a SQLite database: when it
+    ran, which files had changed, and the outcome and duration of each test
+    file and test that ran. Test ids and file paths are stored once, in the
+    names table. The durations of the latest runs are used to schedule the
+    first run of a session, and report shows trends over the runs."""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS names (
+            id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY, started REAL, seconds REAL,
+            green INTEGER, total INTEGER, errors INTEGER,  -- of the suite
+            cancelled INTEGER, changed_files TEXT);
+        CREATE TABLE IF NOT EXISTS modules (
+            run INTEGER, file INTEGER, green INTEGER, total INTEGER,
+            error INTEGER, seconds REAL);
+        CREATE TABLE IF NOT EXISTS tests (
+            run INTEGER, test INTEGER, file INTEGER, outcome TEXT,
+            seconds REAL);
+        CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+        CREATE INDEX IF NOT EXISTS modules_file ON modules (file, run);
+        CREATE INDEX IF NOT EXISTS tests_test ON tests (test, run);
+        CREATE INDEX IF NOT EXISTS tests_file ON tests (file, run);
+    """
+
+    window = 20  # runs of a file or test compared in report
+    max_runs = 200  # latest runs looked at in report
+
+    def __init__(self, path):
+        self.path = path
+        self.name_ids = {}
+        self.execute(lambda db: db.executescript(self.schema))
+
+    def execute(self, function):
+        """calls function with a connection, in a transaction. Connects
+        each time, since runs are recorded from the test run thread."""
+        db = sqlite3.connect(self.path)
+        try:
+            with db:
+                return function(db)
+        finally:
+            db.close()
+
+    def name_id(self, db, name):
+        if name not in self.name_ids:
+            db.execute("INSERT OR IGNORE INTO names (name) VALUES (?)", (name,))
+            self.name_ids[name] = db.execute(
+                "SELECT id FROM names WHERE name = ?", (name,)).fetchone()[0]
+        return self.name_ids[name]
+
+    def record(self, started, seconds, changed_files, cancelled, green, total,
+               module_results, test_outcomes):
+        """adds a run, with the totals of the whole suite, the (file path,
+        (module, green, total, log), seconds) of the test files that ran, and
+        the (test id, file path, outcome, seconds) of their tests"""
+        def insert(db):
+            run = db.execute(
+                "INSERT INTO runs (started, seconds, green, total, errors, "
+                "cancelled, changed_files) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (started, seconds, int(green.real), int(total.real),
+                 int(total.imag), int(cancelled),
+                 None if changed_files is None
+                 else json.dumps(sorted(changed_files)))
+            ).lastrowid
+            db.executemany(
+                "INSERT INTO modules VALUES (?, ?, ?, ?, ?, ?)",
+                [(run, self.name_id(db, file_path), int(green.real),
+                  int(total.real), int(bool(total.imag)), file_seconds)
+                 for file_path, (_module, green, total, _log), file_seconds
+                 in module_results]
+            )
+            db.executemany(
+                "INSERT INTO tests VALUES (?, ?, ?, ?, ?)",
+                [(run, self.name_id(db, test_id), self.name_id(db, file_path),
+                  outcome, test_seconds)
+                 for test_id, file_path, outcome, test_seconds in test_outcomes]
+            )
+        self.execute(insert)
+
+    def latest_durations(self):
+        """returns the durations of the test files that still exist, and of
+        their tests, from the latest run of each file: {file path: seconds}
+        and {file path: {test id: seconds}}"""
+        def query(db):
+            durations = {}
+            for file_path, seconds in db.execute(
+                    "SELECT names.name, modules.seconds FROM modules "
+                    "JOIN (SELECT file, MAX(run) AS run FROM modules "
+                    "GROUP BY file) latest "
+                    "ON modules.file = latest.file AND modules.run = latest.run "
+                    "JOIN names ON names.id = modules.file"):
+                if os.path.exists(file_path):
+                    durations[file_path] = seconds
+            test_durations = {}
+            for test_id, file_path, seconds in db.execute(
+                    "SELECT test_names.name, file_names.name, tests.seconds "
+                    "FROM tests "
+                    "JOIN (SELECT file, MAX(run) AS run FROM modules "
+                    "GROUP BY file) latest "
+                    "ON tests.file = latest.file AND tests.run = latest.run "
+                    "JOIN names test_names ON test_names.id = tests.test "
+                    "JOIN names file_names ON file_names.id = tests.file"):
+                if file_path in durations:
+                    test_durations.setdefault(file_path, {})[test_id] = seconds
+            return durations, test_durations
+        return self.execute(query)
+
+    def report(self):
+        """Duration trends, the test files and tests that got slower, and
+        tests that flip between passing and failing, as text"""
+        return self.execute(lambda db: ''.join([
+            self.daily_report(db),
+            self.slower_report(db, 'modules', 'file', 'Test files'),
+            self.slower_report(db, 'tests', 'test', 'Tests'),
+            self.flaky_report(db),
+        ]))
+
+    def first_run(self, db):
+        """the id of the first of the latest max_runs runs"""
+        row = db.execute(
+            "SELECT MIN(id) FROM (SELECT id FROM runs ORDER BY id DESC "
+            "LIMIT ?)", (self.max_runs,)).fetchone()
+        return row[0] or 0
+
+    def daily_report(self, db):
+        lines = ["Runs per day (runs, average seconds, most tests):\n"]
+        rows = db.execute(
+            "SELECT DATE(started, 'unixepoch', 'localtime') AS day, "
+            "COUNT(*), AVG(seconds), MAX(total) FROM runs "
+            "GROUP BY day ORDER BY day DESC LIMIT 30").fetchall()
+        for day, count, seconds, total in reversed(rows):
+            lines.append("  %s %6i %10.2f %8i\n" % (day, count, seconds, total))
+        if not rows:
+            lines.append("  No runs recorded yet.\n")
+        return ''.join(lines)
+
+    def slower_report(self, db, table, column, title):
+        """lists the files or tests whose average duration over their latest
+        window runs is at least 20% and 0.05 seconds longer than over the
+        window runs before"""
+        timings = {}  # name -> [seconds, newest first]
+        for name, seconds in db.execute(
+                "SELECT names.name, %s.seconds FROM %s "
+                "JOIN names ON names.id = %s.%s WHERE run >= ? "
+                "ORDER BY run DESC" % (table, table, table, column),
+                (self.first_run(db),)):
+            timings.setdefault(name, []).append(seconds)
+        slower = []
+        for name, seconds in timings.items():
+            recent = seconds[:self.window]
+            before = seconds[self.window:2 * self.window]
+            if not before:
+                continue
+            recent_average = sum(recent) / len(recent)
+            before_average = sum(before) / len(before)
+            if recent_average >= 1.2 * before_average and \
+                    recent_average - before_average >= 0.05:
+                slower.append(
+                    (recent_average - before_average, name, before_average,
+                     recent_average))
+        lines = ["\n%s that got slower (seconds before, now):\n" % title]
+        for _increase, name, before_average, recent_average in sorted(
+                slower, reverse=True)[:20]:
+            lines.append("  %8.3f %8.3f  %s\n" % (
+                before_average, recent_average, name))
+        if not slower:
+            lines.append("  None.\n")
+        return ''.join(lines)
+
+    def flaky_report(self, db):
+        """lists the tests that went from passing to failing and back, or the
+        other way around, in the latest runs"""
+        outcomes = {}  # test id -> [passed?, oldest first]
+        for name, outcome in db.execute(
+                "SELECT names.name, tests.outcome FROM tests "
+                "JOIN names ON names.id = tests.test "
+                "WHERE run >= ? AND outcome != 'skipped' ORDER BY run",
+                (self.first_run(db),)):
+            outcomes.setdefault(name, []).append(outcome == 'passed')
+        flaky = []
+        for name, passed in outcomes.items():
+            flips = sum(1 for before, after in zip(passed, passed[1:])
+                        if before != after)
+            if flips >= 2:
+                flaky.append((flips, name))
+        lines = ["\nTests flipping between passing and failing "
+                 "(flips, runs, test):\n"]
+        for flips, name in sorted(flaky, reverse=True)[:20]:
+            lines.append("  %5i %5i  %s\n" % (flips, len(outcomes[name]), name))
+        if not flaky:
+            lines.append("  None.\n")
+        return ''.join(lines)
+
+
 ####
 ## Finding & running tests
 ####
@@ -230,15 +2022,317 @@ def log_exceptions(func):
     return wrapper
 
 
-@log_exceptions
-def run_tests_in_file(file_path):
-    module = file_name_to_module("", file_path)
-    return run_module(module)
+class EventStream:
+    """Where a worker process sends events about the tests it runs: a queue
+    read by the Pytddmon that started the worker, if any"""
+
+    def __init__(self):
+        self.queue = None
+        self.file_path = None
+        self.spool_folder = None  # where to leave long logs
+        self.tracebacks = True  # whether events should have tracebacks
+        self.import_timer = None  # set when profiling imports
+        self.profiler = None  # set when profiling tests
+
+    def send(self, **event):
+        if self.queue is not None:
+            event['file'] = self.file_path
+            self.queue.put(event)
+
+
+event_stream = EventStream()
+
+
+def start_event_stream(event_queue, spool_folder=None, tracebacks=True,
+                       profile_imports=False, profile_pattern=None,
+                       profile_folder=None):
+    """Worker initializer: makes the worker send its test events to
+    event_queue, and leave long logs in spool_folder. Without tracebacks,
+    the events of failed tests do not have their traceback, since only the
+    result writers need them. With profile_imports, the worker times the
+    imports of the test modules it runs. With a profile_pattern, the tests
+    matching it are profiled, see WorkerProfiler."""
+    event_stream.queue = event_queue
+    event_stream.spool_folder = spool_folder
+    event_stream.tracebacks = tracebacks
+    if profile_imports:
+        event_stream.import_timer = ImportTimer()
+        sys.meta_path.insert(0, event_stream.import_timer)
+    if profile_pattern:
+        event_stream.profiler = WorkerProfiler(profile_pattern, profile_folder)
+
+
+class WorkerProfiler:
+    """Profiles the tests in a worker that have ids matching pattern (a
+    glob), with cProfile, and leaves the profile of each job in folder"""
+
+    def __init__(self, pattern, folder):
+        self.pattern = pattern
+        self.folder = folder
+        self.profile = None
+        self.profiling = False
+        self.saved = 0
+
+    def start(self, test_id):
+        if not fnmatch.fnmatchcase(test_id, self.pattern):
+            return
+        if self.profile is None:
+            self.profile = cProfile.Profile()
+        self.profile.enable()
+        self.profiling = True
+
+    def stop(self):
+        if self.profiling:
+            self.profile.disable()
+            self.profiling = False
+
+    def save(self):
+        """saves the profile of the tests profiled since the last save"""
+        if self.profile is None:
+            return
+        self.saved += 1
+        self.profile.dump_stats(os.path.join(
+            self.folder, '%i-%i%s' % (
+                os.getpid(), self.saved, RunProfiles.worker_suffix)))
+        self.profile = None
+
+
+class ImportTimer:
+    """A meta path finder that times the imports of a worker, like python
+    -X importtime: how long running each module took, with (cumulative) and
+    without (self) the time of the modules it imported, and which module
+    imported it. Needs Python 3.4 or later."""
+
+    def __init__(self):
+        self.importing = []  # [module name, seconds of imports] stack
+        self.timings = {}  # module name -> (cumulative, self, parent)
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if hasattr(spec.loader, 'exec_module'):
+            spec.loader = TimedLoader(spec.loader, self)
+        return spec
+
+    def time(self, name, exec_module, module):
+        parent = self.importing[-1][0] if self.importing else None
+        self.importing.append([name, 0.0])
+        start = time.time()
+        try:
+            exec_module(module)
+        finally:
+            cumulative = time.time() - start
+            _name, imports = self.importing.pop()
+            if self.importing:
+                self.importing[-1][1] += cumulative
+            self.timings[name] = (cumulative, cumulative - imports, parent)
+
+    def take(self):
+        """returns the timings since the last take"""
+        timings, self.timings = self.timings, {}
+        return timings
+
+
+class TimedLoader:
+    """Wraps the loader of a module so that ImportTimer times running it. The
+    module gets its own loader back before it runs, so that code checking
+    the type of __loader__ or __spec__.loader, like pkgutil and inspect, is
+    not fooled."""
+
+    def __init__(self, loader, timer):
+        self.loader = loader
+        self.timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def exec_module(self, module):
+        spec = getattr(module, '__spec__', None)
+        if spec is not None and spec.loader is self:
+            spec.loader = self.loader
+        if getattr(module, '__loader__', None) is self:
+            module.__loader__ = self.loader
+        self.timer.time(module.__name__, self.loader.exec_module, module)
+
+
+class SpooledLog:
+    """The log of a test file left by a worker in a spool file, instead of
+    being sent to the parent with the result, since it may be long. It is
+    read when the log is shown."""
+
+    min_length = 4096  # shorter logs are sent with the result
+
+    def __init__(self, path, offset, length):
+        self.path = path
+        self.offset = offset
+        self.length = length
+
+    @classmethod
+    def write(cls, folder, text):
+        """appends text to this process' spool file in folder"""
+        data = text.encode('utf-8')
+        path = os.path.join(folder, '%i.log' % os.getpid())
+        with open(path, 'ab') as spool:
+            spool.seek(0, os.SEEK_END)
+            offset = spool.tell()
+            spool.write(data)
+        return cls(path, offset, len(data))
+
+    def read(self):
+        try:
+            with open(self.path, 'rb') as spool:
+                mapped = mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    data = mapped[self.offset:self.offset + self.length]
+                finally:
+                    mapped.close()
+        except (IOError, OSError, ValueError):
+            return "(The log is no longer available.)\n"
+        return data.decode('utf-8', 'replace')
+
+
+def log_text(log):
+    """The text of a log from a result, which may be a SpooledLog"""
+    if isinstance(log, SpooledLog):
+        return log.read()
+    return log
+
+
+def spool_long_log(result):
+    """returns result, with its log in a spool file if it is long and the
+    worker has a spool folder"""
+    (module, green, total, log) = result
+    if event_stream.spool_folder is None or len(log) < SpooledLog.min_length:
+        return result
+    return module, green, total, SpooledLog.write(event_stream.spool_folder, log)
+
+
+class StreamingTestResult(unittest.TextTestResult):
+    """A test result that sends an event to the event stream when a test is
+    started, and when it has passed, failed, errored or been skipped"""
+
+    def startTest(self, test):
+        self.test_started = time.time()
+        event_stream.send(test=test.id(), outcome='started')
+        unittest.TextTestResult.startTest(self, test)
+        if event_stream.profiler is not None:
+            event_stream.profiler.start(test.id())
+
+    def stopTest(self, test):
+        if event_stream.profiler is not None:
+            event_stream.profiler.stop()
+        unittest.TextTestResult.stopTest(self, test)
+
+    def send(self, test, outcome, err=None):
+        event_stream.send(
+            test=test.id(),
+            outcome=outcome,
+            duration=time.time() - getattr(self, 'test_started', time.time()),
+            traceback=self._exc_info_to_string(err, test)
+            if err and event_stream.tracebacks else None
+        )
+
+    def addSuccess(self, test):
+        unittest.TextTestResult.addSuccess(self, test)
+        self.send(test, 'passed')
+
+    def addFailure(self, test, err):
+        unittest.TextTestResult.addFailure(self, test, err)
+        self.send(test, 'failed', err)
+
+    def addError(self, test, err):
+        unittest.TextTestResult.addError(self, test, err)
+        self.send(test, 'error', err)
+
+    def addSkip(self, test, reason):
+        unittest.TextTestResult.addSkip(self, test, reason)
+        self.send(test, 'skipped')
+
+    def addExpectedFailure(self, test, err):
+        unittest.TextTestResult.addExpectedFailure(self, test, err)
+        self.send(test, 'passed')
+
+    def addUnexpectedSuccess(self, test):
+        unittest.TextTestResult.addUnexpectedSuccess(self, test)
+        self.send(test, 'passed')
+
+
+def merge_shard_results(shard_results):
+    """Merges the (result, info) of the shards of a file into one"""
+    if len(shard_results) == 1:
+        return shard_results[0]
+    module = shard_results[0][0][0]
+    green, total = 0, 0
+    logs = []
+    info = {}
+    for (_module, shard_green, shard_total, log), shard_info in shard_results:
+        green += shard_green
+        total += shard_total
+        if shard_total.imag or shard_green < shard_total:
+            logs.append(log_text(log))
+        for key, value in shard_info.items():
+            info[key] = info.get(key, 0.0) + value
+    if total.imag or green < total:
+        log = ''.join(logs)
+    else:
+        log = "All %i tests passed\n" % green
+    return (module, green, total, log), info
+
+
+def run_job(job):
+    """Runs the tests in one file in a worker process. The job is a tuple
+    (file path, test ids or None for all tests, fail fast, ids of tests not
+    to run or None). Returns the file path, the result of run_tests_in_file
+    and a dict with extra information about the run: its duration, and the
+    seconds spent on importing the module, collecting its tests and running
+    them"""
+    (file_path, test_ids, fail_fast, excluded_ids) = job
+    event_stream.file_path = file_path
+    start = time.time()
+    info = {}
+    result = spool_long_log(run_tests_in_file(
+        file_path, test_ids, fail_fast, info, excluded_ids))
+    info['duration'] = time.time() - start
+    if event_stream.import_timer is not None:
+        info['imports'] = event_stream.import_timer.take()
+    if event_stream.profiler is not None:
+        event_stream.profiler.save()
+    return file_path, result, info
 
 
-def run_module(module):
+@log_exceptions
+def run_tests_in_file(file_path, test_ids=None, fail_fast=False, timings=None,
+                      excluded_ids=None):
+    module = file_name_to_module("", file_path)
+    return run_module(module, test_ids, fail_fast, timings, excluded_ids)
+
+
+def run_module(module, test_ids=None, fail_fast=False, timings=None,
+               excluded_ids=None):
+    """Runs the tests in module, or those with ids in test_ids, except those
+    with ids in excluded_ids. If a timings dict is given, the seconds spent
+    importing, collecting and executing are put in it."""
+    if timings is None:
+        timings = {}
+    start = time.time()
+    __import__(module)
+    timings['import'] = time.time() - start
+    start = time.time()
     suite = find_tests_in_module(module)
-    (green, total, log) = run_suite(suite)
+    if test_ids is not None:
+        suite = filter_suite(suite, set(test_ids))
+    if excluded_ids:
+        suite = filter_suite(suite, set(excluded_ids), keep=False)
+    timings['collect'] = time.time() - start
+    start = time.time()
+    (green, total, log) = run_suite(suite, fail_fast)
+    timings['execute'] = time.time() - start
     return module, green, total, log
 
 
@@ -278,15 +2372,180 @@ def file_name_to_module(base_path, file_name):
 def find_tests_in_module(module):
     suite = unittest.TestSuite()
     suite.addTests(find_unittests_in_module(module))
+    suite.addTests(find_test_functions_in_module(module))
     suite.addTests(find_doctests_in_module(module))
     return suite
 
 
+def filter_suite(suite, test_ids, keep=True):
+    """returns a suite with only the tests of suite having an id in test_ids,
+    or, if not keep, only those not having one"""
+    filtered = unittest.TestSuite()
+    for test in iterate_tests(suite):
+        if (test.id() in test_ids) == keep:
+            filtered.addTest(test)
+    return filtered
+
+
+def iterate_tests(suite):
+    """yields the tests in suite and in the suites it contains"""
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            for contained in iterate_tests(test):
+                yield contained
+        else:
+            yield test
+
+
 def find_unittests_in_module(module):
     test_loader = unittest.TestLoader()
     return test_loader.loadTestsFromName(module)
 
 
+def is_test_function_module(module):
+    """tells if module is named as pytest test files are, test_*.py or
+    *_test.py, so that its test functions are run
+
+    >>> is_test_function_module('tests.test_app')
+    True
+    >>> is_test_function_module('app_test')
+    True
+    >>> is_test_function_module('app')
+    False
+    """
+    name = module.split('.')[-1]
+    return name.startswith('test_') or name.endswith('_test')
+
+
+def find_test_functions_in_module(module):
+    """Collects the module level functions with names starting with "test",
+    in the order they are defined, as pytest does, if module is named as a
+    test file. The other functions of the module may be used as their
+    fixtures, see make_test_function_class."""
+    if not is_test_function_module(module):
+        return unittest.TestSuite()
+    __import__(module)
+    namespace = vars(sys.modules[module])
+    functions = [
+        value for value in namespace.values()
+        if inspect.isfunction(value) and value.__module__ == module
+    ]
+    fixtures = dict(BUILTIN_FIXTURES)
+    tests = []
+    for function in functions:
+        if function.__name__.startswith('test'):
+            tests.append(function)
+        else:
+            fixtures[function.__name__] = fixture_function(function)
+    for name, value in namespace.items():
+        wrapped = fixture_function(value)
+        if wrapped is not value and inspect.isfunction(wrapped):
+            fixtures[name] = wrapped
+    tests.sort(key=lambda function: function.__code__.co_firstlineno)
+    TestFunction = make_test_function_class()
+    return unittest.TestSuite(
+        TestFunction(function, fixtures) for function in tests)
+
+
+def fixture_function(value):
+    """returns the function of a fixture decorated with pytest.fixture, or
+    value if it is not one"""
+    wrapper = getattr(value, '__pytest_wrapped__', None)
+    if wrapper is not None:
+        return wrapper.obj
+    if hasattr(value, '_get_wrapped_function'):
+        return value._get_wrapped_function()
+    return value
+
+
+def argument_names(function):
+    """the names of the arguments of function without default values"""
+    if hasattr(inspect, 'signature'):
+        parameters = inspect.signature(function).parameters.values()
+        return [
+            parameter.name for parameter in parameters
+            if parameter.default is parameter.empty and parameter.kind in (
+                parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+        ]
+    spec = inspect.getargspec(function)
+    return spec.args[:len(spec.args) - len(spec.defaults or ())]
+
+
+def make_test_function_class():
+    """Makes the TestFunction class. It is made when needed, instead of at
+    module level, since unittest would otherwise try to load it as a test
+    case when pytddmon.py is in the monitored folder."""
+
+    class TestFunction(unittest.FunctionTestCase):
+        """A test function, called with its fixtures as arguments. A fixture is
+        a function named like the argument, and may itself take fixtures. If it
+        is a generator, what it yields is the argument, and the rest of it runs
+        after the test, to clean up. Each test gets fixtures of its own."""
+
+        def __init__(self, function, fixtures):
+            unittest.FunctionTestCase.__init__(self, function)
+            self.fixtures = fixtures  # name -> function
+
+        def id(self):
+            function = self._testFunc
+            return '%s.%s' % (function.__module__, function.__name__)
+
+        def __str__(self):
+            return self.id()
+
+        def runTest(self):
+            values = {}
+            generators = []
+            try:
+                function = self._testFunc
+                function(*[
+                    self.fixture_value(name, values, generators, ())
+                    for name in argument_names(function)
+                ])
+            finally:
+                for generator in reversed(generators):
+                    for _ in generator:
+                        raise RuntimeError('fixture %s yielded more than once'
+                                           % generator.__name__)
+
+        def fixture_value(self, name, values, generators, requested_by):
+            if name in values:
+                return values[name]
+            if name in requested_by:
+                raise LookupError('fixture %r requires itself' % name)
+            if name not in self.fixtures:
+                raise LookupError('fixture %r not found' % name)
+            fixture = self.fixtures[name]
+            value = fixture(*[
+                self.fixture_value(
+                    argument, values, generators, requested_by + (name,))
+                for argument in argument_names(fixture)
+            ])
+            if inspect.isgenerator(value):
+                generators.append(value)
+                value = next(value)
+            values[name] = value
+            return value
+
+    return TestFunction
+
+
+def tmp_path():
+    """fixture: a temporary folder, removed after the test"""
+    try:
+        from pathlib import Path
+    except ImportError:
+        Path = str
+    folder = tempfile.mkdtemp(prefix='pytddmon_')
+    try:
+        yield Path(folder)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+BUILTIN_FIXTURES = {'tmp_path': tmp_path}
+
+
 def find_doctests_in_module(module):
     try:
         return doctest.DocTestSuite(module, optionflags=doctest.ELLIPSIS)
@@ -294,7 +2553,7 @@ def find_doctests_in_module(module):
         return unittest.TestSuite()
 
 
-def run_suite(suite):
+def run_suite(suite, fail_fast=False):
     def StringIO():
         if ON_PYTHON3:
             import io as StringIO
@@ -303,7 +2562,12 @@ def run_suite(suite):
         return StringIO.StringIO()
 
     err_log = StringIO()
-    text_test_runner = unittest.TextTestRunner(stream=err_log, verbosity=1)
+    text_test_runner = unittest.TextTestRunner(
+        stream=err_log,
+        verbosity=1,
+        failfast=fail_fast,
+        resultclass=StreamingTestResult
+    )
     result = text_test_runner.run(suite)
     green = result.testsRun - len(result.failures) - len(result.errors)
     total = result.testsRun
@@ -311,6 +2575,131 @@ def run_suite(suite):
     return green, total, log
 
 
+####
+## Writing results
+####
+
+class ResultWriter:
+    """Writes structured records of test results to a stream as they come:
+    one for each finished test (from its test event), and one for each test
+    file run or reused from the result cache. Subclasses write the records
+    in their format, in write(record)."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def test_record(self, event):
+        return {
+            'type': 'test',
+            'id': event['test'],
+            'file': event['file'],
+            'outcome': event['outcome'],
+            'duration': event.get('duration'),
+            'traceback': event.get('traceback'),
+        }
+
+    def file_record(self, file_path, result, info):
+        (module, green, total, log) = result
+        if total.imag:
+            outcome = 'error'
+        elif green < total:
+            outcome = 'failed'
+        else:
+            outcome = 'passed'
+        return {
+            'type': 'file',
+            'id': module,
+            'file': file_path,
+            'outcome': outcome,
+            'green': int(green.real),
+            'total': int(total.real),
+            'duration': info.get('duration'),
+            'traceback': log_text(log) if outcome != 'passed' else None,
+            'cached': info.get('cached', False),
+        }
+
+    def write_test(self, event):
+        self.write(self.test_record(event))
+
+    def write_file(self, file_path, result, info):
+        self.write(self.file_record(file_path, result, info))
+
+    def close(self):
+        pass
+
+
+class JsonLinesWriter(ResultWriter):
+    """One JSON object per line"""
+
+    def write(self, record):
+        self.stream.write(json.dumps(record) + '\n')
+        self.stream.flush()
+
+
+class JsonWriter(ResultWriter):
+    """A JSON array of records, written one record at a time"""
+
+    def __init__(self, stream):
+        ResultWriter.__init__(self, stream)
+        self.separator = '[\n'
+
+    def write(self, record):
+        self.stream.write(self.separator + json.dumps(record))
+        self.separator = ',\n'
+        self.stream.flush()
+
+    def close(self):
+        self.stream.write('[\n' if self.separator == '[\n' else '\n')
+        self.stream.write(']\n')
+
+
+class JUnitWriter(ResultWriter):
+    """JUnit XML, with a testcase for each test. Since the number of tests is
+    not known until the end, there is one testsuite without counts. Test
+    files that could not be run at all, like when their import fails, and
+    those whose results were reused from the result cache, become a testcase
+    of their own."""
+
+    def __init__(self, stream):
+        ResultWriter.__init__(self, stream)
+        self.stream.write(
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<testsuites>\n<testsuite name="pytddmon">\n')
+
+    def write(self, record):
+        if record['type'] == 'file':
+            if record['outcome'] != 'error' and not record['cached']:
+                return
+            classname, name = record['id'], record['id']
+        else:
+            classname, _dot, name = record['id'].rpartition('.')
+        self.stream.write('<testcase classname=%s name=%s file=%s time="%.3f"' % (
+            quoteattr(classname), quoteattr(name), quoteattr(record['file']),
+            record['duration'] or 0.0))
+        if record['outcome'] == 'passed':
+            self.stream.write('/>\n')
+            return
+        self.stream.write('>')
+        if record['outcome'] == 'skipped':
+            self.stream.write('<skipped/>')
+        else:
+            tag = 'failure' if record['outcome'] == 'failed' else 'error'
+            self.stream.write('<%s>%s</%s>' % (
+                tag, xml_escape(record['traceback'] or ''), tag))
+        self.stream.write('</testcase>\n')
+        self.stream.flush()
+
+    def close(self):
+        self.stream.write('</testsuite>\n</testsuites>\n')
+
+
+RESULT_WRITERS = {
+    'json': JsonWriter,
+    'jsonl': JsonLinesWriter,
+    'junit': JUnitWriter,
+}
+
+
 ####
 ## GUI
 ####
@@ -356,6 +2745,10 @@ class TKGUIButton(object):
         self.bind_click(display_log_callback)
         self.pack()
 
+    def bind_right_click(self, callback):
+        """Binds the right mouse button click event to callback"""
+        self.label.bind('<Button-3>', callback)
+
     def bind_click(self, display_log_callback):
         """Binds the left mouse button click event to trigger the log_windows
         display method"""
@@ -380,6 +2773,93 @@ class TKGUIButton(object):
         )
 
 
+class TkLogView(object):
+    """Shows a RunLog in a tk Text widget. Only the sections of the modules
+    whose log changed since it was last shown are replaced. Clicking the
+    title of a section collapses or expands it."""
+
+    def __init__(self, tkinter, text):
+        self.tkinter = tkinter
+        self.text = text
+        self.header = None
+        self.note = ''
+        self.shown = []  # (module, log) in the order shown
+        self.collapsed = set()
+        text.tag_configure('title', underline=1)
+
+    def show(self, run_log):
+        sections, note = run_log.visible_sections()
+        self.text['state'] = self.tkinter.NORMAL
+        header = run_log.get_header()
+        if header != self.header:
+            self.replace('header', header, '1.0')
+            self.header = header
+        self.show_sections([(module, log) for module, log, _ in sections])
+        if note != self.note:
+            self.replace('note', note, self.tkinter.END)
+            self.note = note
+        self.text['state'] = self.tkinter.DISABLED
+
+    def show_sections(self, sections):
+        modules = set(module for module, _log in sections)
+        for module, log in list(self.shown):
+            if module not in modules:
+                self.delete_section(module)
+                self.shown.remove((module, log))
+        for position, section in enumerate(sections):
+            if position < len(self.shown) and self.shown[position] == section:
+                continue
+            for old in self.shown[position:]:
+                if old[0] == section[0]:
+                    self.delete_section(old[0])
+                    self.shown.remove(old)
+                    break
+            self.insert_section(position, *section)
+            self.shown.insert(position, section)
+
+    def replace(self, tag, chars, index):
+        ranges = self.text.tag_ranges(tag)
+        if ranges:
+            index = ranges[0]
+            self.text.delete(ranges[0], ranges[-1])
+        if chars:
+            self.text.insert(index, chars, (tag,))
+
+    def insert_section(self, position, module, log):
+        if position < len(self.shown):
+            index = self.text.tag_ranges('section-' + self.shown[position][0])[0]
+        elif self.note:
+            index = self.text.tag_ranges('note')[0]
+        else:
+            index = self.tkinter.END
+        self.text.insert(
+            index,
+            section_title(module), ('section-' + module, 'title', 'title-' + module),
+            log, ('section-' + module, 'body-' + module)
+        )
+        self.text.tag_configure('body-' + module, elide=module in self.collapsed)
+        self.text.tag_bind(
+            'title-' + module,
+            '<Button-1>',
+            lambda _event: self.toggle(module)
+        )
+
+    def delete_section(self, module):
+        ranges = self.text.tag_ranges('section-' + module)
+        if ranges:
+            self.text.delete(ranges[0], ranges[-1])
+        self.text.tag_delete(
+            'section-' + module, 'title-' + module, 'body-' + module)
+
+    def toggle(self, module):
+        """collapses or expands the log of module"""
+        if module in self.collapsed:
+            self.collapsed.remove(module)
+        else:
+            self.collapsed.add(module)
+        self.text.tag_configure('body-' + module, elide=module in self.collapsed)
+
+
 class TkGUI(object):
     """Connect pytddmon engine to Tkinter GUI toolkit"""
 
@@ -400,11 +2880,21 @@ class TkGUI(object):
             self.frame,
             self.display_log_message
         )
+        self.button.bind_right_click(self.run_all_tests)
         self.status_bar = None
         self.building_status_bar()
         self.frame.grid()
         self.message_window = None
         self.text = None
+        self.log_view = None
+        self.log_outdated = True
+        self.last_progress_shown = 0
+        self.shown = None  # (text, rgb) of the button
+        self.status_shown = None
+        self.poll_interval = PollInterval()
+        self.quiet_check_scheduled = False
+        self.full_run_requested = False
+        self.runner = BackgroundRunner(pytddmon)
 
         if ON_WINDOWS:
             buttons_width = 25
@@ -453,15 +2943,13 @@ class TkGUI(object):
         self.status_bar.pack(expand=1, fill="both")
 
     def _update_and_get_color(self):
-        """Calculate the current color and trigger pulse"""
+        """Calculate the current color"""
         self.color_picker.set_result(
             self.pytddmon.total_tests_passed,
             self.pytddmon.total_tests_run,
         )
         light, color = self.color_picker.pick()
-        rgb = self.color_picker.translate_color(light, color)
-        self.color_picker.pulse()
-        return rgb
+        return self.color_picker.translate_color(light, color)
 
     def _get_text(self):
         """Calculates the text to show the user(passed/total or Error!)"""
@@ -475,17 +2963,59 @@ class TkGUI(object):
         return text
 
     def update(self):
-        """updates the tk gui"""
-        rgb = self._update_and_get_color()
-        text = self._get_text()
+        """updates the tk gui, unless tests are running: then show_progress
+        does"""
+        if self.runner.running:
+            return
+        self.show(self._get_text(), self._update_and_get_color())
+        self.update_status(self.pytddmon.get_status_message())
+
+    def show(self, text, rgb):
+        """shows text and color on the button, unless they already are"""
+        if (text, rgb) == self.shown:
+            return
+        self.shown = (text, rgb)
         self.button.update(text, rgb)
         self.root.configure(bg=rgb)
-        self.update_status(self.pytddmon.get_status_message())
 
-        if self.pytddmon.change_detected:
-            self.update_text_window()
+    def pulse(self):
+        """the heartbeat: switches between the light and dark shade of the
+        color, unless tests are running"""
+        if not self.runner.running:
+            self.color_picker.pulse()
+            self.show(self._get_text(), self._update_and_get_color())
+        self.frame.after(750, self.pulse)
+
+    def show_progress(self, event):
+        """shows the counts so far while tests run, so the window turns red
+        as soon as a test fails. Repaints at most ten times a second, unless
+        the color changes."""
+        old_color = self.color_picker.color
+        self.color_picker.set_result(
+            self.pytddmon.tests_passed_so_far,
+            self.pytddmon.tests_run_so_far,
+        )
+        light, color = self.color_picker.pick()
+        now = time.time()
+        if color == old_color and now - self.last_progress_shown < 0.1:
+            return
+        self.last_progress_shown = now
+        rgb = self.color_picker.translate_color(light, color)
+        self.show(
+            "%r/%r" % (
+                self.pytddmon.tests_passed_so_far,
+                self.pytddmon.tests_run_so_far
+            ),
+            rgb
+        )
+        self.status_bar.configure(text='Testing %s' % event['test'])
+        self.status_shown = None
+        self.root.update_idletasks()
 
     def update_status(self, message):
+        if message == self.status_shown:
+            return
+        self.status_shown = message
         self.status_bar.configure(
             text=message
         )
@@ -505,20 +3035,23 @@ class TkGUI(object):
         win.protocol('WM_DELETE_WINDOW', self.when_message_window_x)
         self.message_window = win
         self.text = self.tkinter.Text(win)
+        self.text['state'] = self.tkinter.DISABLED
+        self.text.pack(expand=1, fill='both')
+        self.text.focus_set()
+        self.log_view = TkLogView(self.tkinter, self.text)
         self.message_window.withdraw()
 
     def when_message_window_x(self):
         self.message_window.withdraw()
 
     def update_text_window(self):
-        """inserts/replaces the log message in the text widget"""
-        text = self.text
-        text['state'] = self.tkinter.NORMAL
-        text.delete(1.0, self.tkinter.END)
-        text.insert(self.tkinter.INSERT, self.get_text_message())
-        text['state'] = self.tkinter.DISABLED
-        text.pack(expand=1, fill='both')
-        text.focus_set()
+        """shows the changes of the log in the text widget. While the window
+        is hidden, this waits until it is shown."""
+        if self.message_window.state() != 'normal':
+            self.log_outdated = True
+            return
+        self.log_view.show(self.pytddmon.log)
+        self.log_outdated = False
 
     def display_log_message(self, _arg):
         """displays/close the log message from pytddmon in a window"""
@@ -526,18 +3059,105 @@ class TkGUI(object):
             self.message_window.withdraw()
         else:
             self.message_window.state('normal')
+            if self.log_outdated:
+                self.update_text_window()
+
+    def run_all_tests(self, _arg):
+        """runs all tests, also those not affected by the latest changes"""
+        if self.runner.running:
+            self.full_run_requested = True
+            self.pytddmon.cancel_requested.set()
+        else:
+            self.start_run(None)
+
+    def start_run(self, changed_files):
+        """starts a test run in the background"""
+        self.update_status('Testing...')
+        self.runner.start(changed_files)
+        self.poll_runner()
+
+    def poll_runner(self):
+        """shows what the background test run has sent, until it is done"""
+        for kind, event in self.runner.take_messages():
+            if kind == 'progress':
+                self.show_progress(event)
+            else:
+                self.when_run_done()
+        if self.runner.running:
+            self.frame.after(50, self.poll_runner)
 
-    def loop(self):
-        """the main loop"""
+    def when_run_done(self):
+        """shows the results of a finished test run, and starts the next one
+        if it was asked for while running"""
+        self.update()
+        self.update_text_window()
+        if self.full_run_requested:
+            self.full_run_requested = False
+            self.start_run(None)
+        else:
+            self.check_for_changes()
+
+    def check_for_changes(self):
+        """starts a test run if files changed, returns True if it did. While
+        a run is in progress, changes are collected for the next run, and
+        cancel the run when debouncing."""
+        started = False
+        if self.runner.running:
+            if self.pytddmon.note_changes() and \
+                    self.pytddmon.debouncer.quiet_period:
+                self.pytddmon.cancel_requested.set()
+            return False
         if self.pytddmon.get_and_set_change_detected():
-            self.update_status('Testing...')
-            self.pytddmon.run_tests()
+            self.start_run(self.pytddmon.changed_files)
+            started = True
+        debouncer = self.pytddmon.debouncer
+        if debouncer.is_pending() and not self.quiet_check_scheduled:
+            self.quiet_check_scheduled = True
+            self.frame.after(
+                int(debouncer.seconds_until_quiet() * 1000) + 1,
+                self.when_quiet
+            )
+        return started
+
+    def when_quiet(self):
+        """called when the debounce period after the last change is over"""
+        self.quiet_check_scheduled = False
+        self.check_for_changes()
+
+    def when_files_changed(self, _file, _mask):
+        """called by tk as soon as the monitor has file events to read"""
+        self.check_for_changes()
+
+    def watch_monitor(self):
+        """lets tk wake us up when a monitor with a file descriptor (like
+        InotifyMonitor) has events, instead of waiting for the next loop"""
+        fileno = getattr(self.pytddmon.monitor, 'fileno', None)
+        if fileno is None or not hasattr(self.root.tk, 'createfilehandler'):
+            return
+        self.root.tk.createfilehandler(
+            fileno(),
+            self.tkinter.READABLE,
+            self.when_files_changed
+        )
+
+    def loop(self):
+        """the main loop. Looks for changes often after files changed, and
+        less and less often while they do not."""
+        started = self.check_for_changes()
+        if started or self.runner.running or \
+                self.pytddmon.debouncer.is_pending():
+            self.poll_interval.reset()
+        else:
+            self.poll_interval.back_off()
         self.update()
-        self.frame.after(750, self.loop)
+        self.frame.after(self.poll_interval.milliseconds(), self.loop)
 
     def run(self):
         """starts the main loop and goes into sleep"""
+        self.watch_monitor()
         self.loop()
+        if not self.pytddmon.pulse_disabled:
+            self.frame.after(750, self.pulse)
         self.root.mainloop()
 
 class ColorPicker:
@@ -596,9 +3216,274 @@ class ColorPicker:
         return "#" + cls.color_table[(light, color)]
 
 
+####
+## Headless
+####
+
+class DaemonClient:
+    """A connection to the Daemon, with its unread input and unsent output.
+    A client that lets more than max_outbox bytes pile up without reading
+    them is stalled, and gets disconnected."""
+
+    max_outbox = 4 * 1024 ** 2
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.inbox = b''
+        self.outbox = b''
+        self.subscribed = False
+        self.stalled = False
+
+    def fileno(self):
+        return self.connection.fileno()
+
+    def send(self, message):
+        if len(self.outbox) > self.max_outbox:
+            self.stalled = True
+            return
+        self.outbox += (json.dumps(message) + '\n').encode('utf-8')
+
+
+class Daemon:
+    """Connect pytddmon engine to a Unix domain socket, to run without a GUI.
+
+    Clients send one JSON object per line and get one JSON object per line
+    back. Commands are:
+        {"command": "status"}     the results of the latest run
+        {"command": "log"}        the log of the latest run
+        {"command": "run"}        starts running all tests
+        {"command": "subscribe"}  from now on, sends {"event": "started"},
+                                  {"event": "progress", ...} and
+                                  {"event": "done", "status": ...} messages
+                                  for every run
+    """
+
+    def __init__(self, pytddmon, socket_path):
+        self.pytddmon = pytddmon
+        self.socket_path = socket_path
+        self.runner = BackgroundRunner(pytddmon)
+        self.listener = None
+        self.clients = {}  # socket -> DaemonClient
+        self.full_run_requested = False
+        self.poll_interval = PollInterval()
+        self.last_poll = 0
+        self.snapshot = None  # the results of the latest finished run
+        self.snapshot_log = None
+        self.take_snapshot()
+
+    def listen(self):
+        """binds the socket, unless another daemon is already listening"""
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except socket.error:
+                os.remove(self.socket_path)
+            else:
+                raise SystemExit(
+                    'A pytddmon daemon already listens on %s' % self.socket_path)
+            finally:
+                probe.close()
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        self.listener.listen(5)
+        self.listener.setblocking(False)
+
+    def close(self):
+        for client in list(self.clients.values()):
+            self.disconnect(client)
+        if self.listener is not None:
+            self.listener.close()
+            os.remove(self.socket_path)
+
+    def run(self):
+        """listens and serves until interrupted"""
+        self.listen()
+        try:
+            while True:
+                self.step()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def step(self):
+        """waits for something to do, and does it"""
+        readable = [self.listener] + list(self.clients)
+        monitor_fileno = getattr(self.pytddmon.monitor, 'fileno', None)
+        if monitor_fileno is not None:
+            readable.append(monitor_fileno())
+        writable = [sock for sock, client in self.clients.items()
+                    if client.outbox]
+        ready, ready_to_write, _ = select.select(
+            readable, writable, [], self.timeout())
+        for sock in ready:
+            if sock is self.listener:
+                self.accept()
+            elif sock in self.clients:
+                self.receive(self.clients[sock])
+        for sock in ready_to_write:
+            if sock in self.clients:
+                self.flush(self.clients[sock])
+        self.take_runner_messages()
+        for client in list(self.clients.values()):
+            if client.stalled:
+                self.disconnect(client)
+        now = time.time()
+        debouncer = self.pytddmon.debouncer
+        if (monitor_fileno is not None and monitor_fileno() in ready) or \
+                (monitor_fileno is None and
+                 now - self.last_poll >= self.poll_interval.seconds) or \
+                (debouncer.is_pending() and debouncer.is_quiet()):
+            self.last_poll = now
+            self.check_for_changes()
+            if self.runner.running or debouncer.is_pending():
+                self.poll_interval.reset()
+            else:
+                self.poll_interval.back_off()
+
+    def timeout(self):
+        """how long to wait in select: not at all long while tests run, until
+        the debounce period is over when there are changes, and forever when
+        the monitor wakes us up"""
+        if self.runner.running:
+            return 0.05
+        if self.pytddmon.debouncer.is_pending():
+            return self.pytddmon.debouncer.seconds_until_quiet()
+        if hasattr(self.pytddmon.monitor, 'fileno'):
+            return None
+        return max(
+            0, self.last_poll + self.poll_interval.seconds - time.time())
+
+    def check_for_changes(self):
+        """starts a test run if files changed. While a run is in progress,
+        changes are collected for the next run, and cancel the run when
+        debouncing."""
+        if self.runner.running:
+            if self.pytddmon.note_changes() and \
+                    self.pytddmon.debouncer.quiet_period:
+                self.pytddmon.cancel_requested.set()
+        elif self.pytddmon.get_and_set_change_detected():
+            self.start_run(self.pytddmon.changed_files)
+
+    def start_run(self, changed_files):
+        self.runner.start(changed_files)
+        self.publish({'event': 'started'})
+
+    def take_runner_messages(self):
+        for kind, event in self.runner.take_messages():
+            if kind == 'progress':
+                self.publish({
+                    'event': 'progress',
+                    'test': event['test'],
+                    'outcome': event['outcome'],
+                    'duration': event.get('duration'),
+                })
+            else:
+                self.take_snapshot()
+                self.publish({'event': 'done', 'status': self.status()})
+                if self.full_run_requested:
+                    self.full_run_requested = False
+                    self.start_run(None)
+                else:
+                    self.check_for_changes()
+
+    def publish(self, message):
+        for client in self.clients.values():
+            if client.subscribed:
+                client.send(message)
+
+    def take_snapshot(self):
+        """Keeps the results and log of the run that just finished, to serve
+        while the next run changes them in the background"""
+        pytddmon = self.pytddmon
+        modules = []
+        for (module, green, total, _log) in sorted(pytddmon.results.values()):
+            modules.append({
+                'module': module,
+                'green': int(green.real),
+                'total': int(total.real),
+                'error': bool(total.imag),
+            })
+        self.snapshot = {
+            'green': int(pytddmon.total_tests_passed.real),
+            'total': int(pytddmon.total_tests_run.real),
+            'error': bool(pytddmon.total_tests_run.imag),
+            'last_run': pytddmon.get_status_message(),
+            'run_time': pytddmon.last_test_run_time,
+            'modules': modules,
+        }
+        self.snapshot_log = pytddmon.get_log()
+
+    def status(self):
+        """the results of the latest finished run, as a JSON friendly dict"""
+        status = dict(self.snapshot)
+        status['running'] = self.runner.running
+        return status
+
+    def handle_request(self, client, request):
+        command = request.get('command') if isinstance(request, dict) else None
+        if command == 'status':
+            client.send(self.status())
+        elif command == 'log':
+            client.send({'log': self.snapshot_log})
+        elif command == 'run':
+            if self.runner.running:
+                self.full_run_requested = True
+                self.pytddmon.cancel_requested.set()
+            else:
+                self.start_run(None)
+            client.send({'ok': True})
+        elif command == 'subscribe':
+            client.subscribed = True
+            client.send({'ok': True})
+        else:
+            client.send({'error': 'unknown command %r' % (command,)})
+
+    def accept(self):
+        try:
+            connection, _address = self.listener.accept()
+        except socket.error:
+            return
+        connection.setblocking(False)
+        self.clients[connection] = DaemonClient(connection)
+
+    def receive(self, client):
+        try:
+            data = client.connection.recv(65536)
+        except socket.error:
+            data = b''
+        if not data:
+            self.disconnect(client)
+            return
+        client.inbox += data
+        while b'\n' in client.inbox:
+            line, client.inbox = client.inbox.split(b'\n', 1)
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line.decode('utf-8'))
+            except ValueError:
+                client.send({'error': 'requests must be JSON objects'})
+                continue
+            self.handle_request(client, request)
+
+    def flush(self, client):
+        try:
+            sent = client.connection.send(client.outbox)
+        except socket.error:
+            self.disconnect(client)
+            return
+        client.outbox = client.outbox[sent:]
+
+    def disconnect(self, client):
+        self.clients.pop(client.connection, None)
+        client.connection.close()
+
+
 def parse_commandline():
     """
-    returns (files, test_mode) created from the command line arguments
+    returns (files, options) created from the command line arguments
     passed to pytddmon.
     """
     parser = optparse.OptionParser()
@@ -610,6 +3495,22 @@ def parse_commandline():
     parser.add_option(
         "--log-path",
         help='Instead of writing to "pytddmon.log" in --log-and-exit, write to LOG_PATH.')
+    parser.add_option(
+        "--daemon",
+        action="store_true",
+        default=False,
+        help='Run without a window, serving results as JSON over a Unix '
+             'domain socket (see --socket).')
+    parser.add_option(
+        "--socket",
+        help='The socket path for --daemon. Default is %s/pytddmon.sock.'
+             % CACHE_FOLDER)
+    parser.add_option(
+        "--format",
+        choices=sorted(RESULT_WRITERS),
+        help='With --log-and-exit, write a record for each test and test file '
+             'run to the log, as they finish, in this format: json, jsonl '
+             '(JSON lines) or junit (JUnit XML).')
     parser.add_option(
         "--gen-kata",
         help='Generate a stub unit test file appropriate for jump starting a kata')
@@ -619,17 +3520,205 @@ def parse_commandline():
         action="store_true",
         default=False,
         help='Disable the "heartbeating colorshift" of pytddmon.')
+    parser.add_option(
+        "--preload",
+        metavar="MODULES",
+        help='Comma separated list of stable (third-party) modules to import '
+             'once into a warm parent process that test workers are forked '
+             'from. Changes to these modules require restarting pytddmon.')
+    parser.add_option(
+        "--jobs",
+        "-j",
+        default="1",
+        help='Run up to JOBS test modules in parallel, each in a process of '
+             'its own. "auto" uses one process per CPU core. Default is 1.')
+    parser.add_option(
+        "--selective",
+        action="store_true",
+        default=False,
+        help='When files change, only run the test files that import them, '
+             'directly or transitively. Right-click the window to run all '
+             'tests.')
+    parser.add_option(
+        "--include",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help='Monitor and run files with names matching GLOB, instead of '
+             '"*.py". May be given several times.')
+    parser.add_option(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help='Skip files and folders matching GLOB, in .gitignore syntax. '
+             'May be given several times.')
+    parser.add_option(
+        "--no-gitignore",
+        dest="gitignore",
+        action="store_false",
+        default=True,
+        help='Do not skip the files and folders listed in .gitignore.')
+    parser.add_option(
+        "--failures-first",
+        action="store_true",
+        default=False,
+        help='Before each run, re-run the tests that failed in the previous '
+             'run on their own, to show quickly whether they pass now.')
+    parser.add_option(
+        "--fail-fast",
+        action="store_true",
+        default=False,
+        help='Stop a run at the first test failing that did not fail in the '
+             'previous run.')
+    parser.add_option(
+        "--failures-only",
+        action="store_true",
+        default=False,
+        help='With --failures-first, do not go on with the other tests '
+             'while some of those that failed in the previous run still fail.')
+    parser.add_option(
+        "--slowest",
+        type="int",
+        default=10,
+        metavar="N",
+        help='Report the N slowest tests and test files in the log. '
+             'Default is 10, 0 reports none.')
+    parser.add_option(
+        "--max-log-size",
+        type="int",
+        default=RunLog.max_size,
+        metavar="CHARS",
+        help='Limit the log to CHARS characters, leaving out the logs of the '
+             'last modules. Default is %default.')
+    parser.add_option(
+        "--profile-imports",
+        action="store_true",
+        default=False,
+        help='Time the imports of the test modules, and show them as a tree '
+             'in the log. They are also written to %s/import_profile.json.'
+             % CACHE_FOLDER)
+    parser.add_option(
+        "--profile",
+        metavar="GLOB",
+        help='Profile the tests with ids matching GLOB, like "*" for all '
+             'tests, or "tests.test_slow.*", with cProfile. The profile of '
+             'each run is kept in %s/profiles, as pstats and as collapsed '
+             'stacks for flame graphs.' % CACHE_FOLDER)
+    parser.add_option(
+        "--history",
+        action="store_true",
+        default=False,
+        help='Keep the results and durations of every run in %s/history.'
+             'sqlite, and use them to schedule the first run.'
+             % CACHE_FOLDER)
+    parser.add_option(
+        "--report",
+        action="store_true",
+        default=False,
+        help='Show duration trends, tests and test files that got slower, '
+             'and flaky tests, from the runs kept with --history, and exit.')
+    parser.add_option(
+        "--debounce",
+        type="float",
+        default=0.2,
+        metavar="SECONDS",
+        help='Wait until no file has changed for SECONDS before running the '
+             'tests, and cancel a run when files change during it. 0 turns '
+             'this off. Default is %default.')
+    parser.add_option(
+        "--poll",
+        action="store_true",
+        default=False,
+        help='Look for file changes by scanning the folder regularly, '
+             'even where file system events (inotify) are available.')
+    parser.add_option(
+        "--hash",
+        dest="hashing",
+        action="store_true",
+        default=False,
+        help='Only count a file as changed if its content changed, not just '
+             'its modification time. Content digests are cached in the %s '
+             'folder.' % CACHE_FOLDER)
+    parser.add_option(
+        "--cache-results",
+        action="store_true",
+        default=False,
+        help='Reuse the results of test files when neither they nor the '
+             'files they import changed, also between pytddmon sessions. '
+             'Results are kept in the %s folder. Not suitable for tests that '
+             'depend on data files or other outside state.' % CACHE_FOLDER)
     (options, args) = parser.parse_args()
-    return (
-        args,
-        options.log_and_exit,
-        options.log_path,
-        options.pulse_disabled,
-        options.gen_kata)
+    try:
+        jobs = parse_jobs(options.jobs)
+    except ValueError:
+        parser.error('--jobs must be a positive number or "auto"')
+    options.jobs = jobs
+    preload = [name.strip() for name in (options.preload or '').split(',')]
+    options.preload = [name for name in preload if name]
+    if options.failures_only and not options.failures_first:
+        parser.error('--failures-only can only be used with --failures-first')
+    if options.format and not options.log_and_exit:
+        parser.error('--format can only be used with --log-and-exit')
+    if (options.history or options.report) and sqlite3 is None:
+        parser.error('--history and --report need Python with sqlite3')
+    if options.profile_imports and sys.version_info < (3, 4):
+        parser.error('--profile-imports needs Python 3.4 or later')
+    if options.daemon and not hasattr(socket, 'AF_UNIX'):
+        parser.error('--daemon needs Unix domain sockets, which this '
+                     'platform does not have')
+    return args, options
+
+
+def parse_jobs(value):
+    """
+    Translates the --jobs argument to a number of worker processes.
+
+    >>> parse_jobs("4")
+    4
+    >>> parse_jobs("auto") == multiprocessing.cpu_count()
+    True
+    """
+    if value == 'auto':
+        return multiprocessing.cpu_count()
+    jobs = int(value)
+    if jobs < 1:
+        raise ValueError(value)
+    return jobs
+
+
+def read_config(root):
+    """returns the settings in the [pytddmon] section of setup.cfg or tox.ini
+    in root as a dict, the first file having the section wins"""
+    try:
+        from configparser import RawConfigParser, Error
+    except ImportError:
+        from ConfigParser import RawConfigParser, Error
+    for name in CONFIG_FILES:
+        config = RawConfigParser()
+        try:
+            config.read(os.path.join(root, name))
+        except Error:
+            continue
+        if config.has_section('pytddmon'):
+            return dict(config.items('pytddmon'))
+    return {}
+
 
+def build_monitor(file_finder, polling=False, hashing=False):
+    monitor = build_stat_monitor(file_finder, polling)
+    if hashing:
+        hasher = ContentHasher(
+            cache_file_path(file_finder.root, 'digests.json'))
+        monitor = HashingMonitor(monitor, file_finder, hasher)
+    return monitor
 
-def build_monitor(file_finder):
-    os.stat_float_times(False)
+
+def build_stat_monitor(file_finder, polling):
+    if not polling and can_use_inotify():
+        return InotifyMonitor(file_finder)
+    if hasattr(os, 'scandir'):
+        return ScanningMonitor(file_finder)
 
     def get_file_size(file_path):
         stat = os.stat(file_path)
@@ -642,6 +3731,17 @@ def build_monitor(file_finder):
     return Monitor(file_finder, get_file_size, get_file_modtime)
 
 
+def build_result_cache(root):
+    # The result cache has digests of its own: sharing them with a
+    # HashingMonitor would make the monitor miss changes that the cache
+    # happened to digest first.
+    return ResultCache(
+        cache_file_path(root, 'results'),
+        ContentHasher(cache_file_path(root, 'result_digests.json')),
+        ImportGraph(root)
+    )
+
+
 def run():
     """
     The main function: basic initialization and program start
@@ -652,41 +3752,88 @@ def run():
     sys.path[:0] = [cwd]
 
     # Command line argument handling
-    (static_file_set, test_mode, test_output, pulse_disabled, kata_name) = parse_commandline()
+    (static_file_set, options) = parse_commandline()
+    config = read_config(cwd)
 
     # Generating a kata unit test file? Do it and exit ...
-    if kata_name:
-        kata = Kata(kata_name)
+    if options.gen_kata:
+        kata = Kata(options.gen_kata)
         print('Writing kata unit test template to ' + kata.filename + '.')
         with open(kata.filename, 'w') as f:
             f.write(kata.content)
         return
 
+    # Reporting on the history of runs? Do it and exit ...
+    if options.report:
+        print(RunHistory(cache_file_path(cwd, 'history.sqlite')).report())
+        return
+
     # What files to monitor?
-    if not static_file_set:
+    includes = options.include + config.get('include', '').split()
+    if not static_file_set and not includes:
         regex = wildcard_to_regex("*.py")
     else:
-        regex = '|'.join(static_file_set)
-    file_finder = FileFinder(cwd, regex)
+        regex = '|'.join(
+            static_file_set + [wildcard_to_regex(glob) for glob in includes])
+    file_finder = FileFinder(
+        cwd,
+        regex,
+        excludes=options.exclude + config.get('exclude', '').split(),
+        use_gitignore=options.gitignore and
+        config.get('gitignore', 'true').lower() in ('true', 'yes', 'on', '1')
+    )
 
     # The change detector: Monitor
-    monitor = build_monitor(file_finder)
+    monitor = build_monitor(file_finder, options.poll, options.hashing)
+
+    # Structured results are written as the tests run
+    result_writer = None
+    if options.format:
+        outputfile = options.log_path or 'pytddmon.' + {
+            'json': 'json', 'jsonl': 'jsonl', 'junit': 'xml'}[options.format]
+        result_writer = RESULT_WRITERS[options.format](open(outputfile, 'w'))
 
     # Python engine ready to be setup
     pytddmon = Pytddmon(
         file_finder,
         monitor,
         project_name=os.path.basename(cwd),
-        pulse_disabled=pulse_disabled
+        pulse_disabled=options.pulse_disabled,
+        pool_factory=PoolFactory(options.preload),
+        jobs=options.jobs,
+        import_graph=ImportGraph(cwd) if options.selective else None,
+        result_cache=build_result_cache(cwd) if options.cache_results else None,
+        failures_first=options.failures_first,
+        fail_fast=options.fail_fast,
+        failures_only=options.failures_only,
+        # No later run would take over a cancelled one in --log-and-exit
+        debounce=0.0 if options.log_and_exit else options.debounce,
+        slowest=options.slowest,
+        result_writer=result_writer,
+        max_log_size=options.max_log_size,
+        import_profile_path=cache_file_path(cwd, 'import_profile.json')
+        if options.profile_imports else None,
+        run_profiles=RunProfiles(
+            os.path.join(cwd, CACHE_FOLDER, 'profiles'), options.profile)
+        if options.profile else None,
+        history=RunHistory(cache_file_path(cwd, 'history.sqlite'))
+        if options.history else None
     )
 
     # Start the engine
-    if not test_mode:
+    if options.daemon:
+        socket_path = options.socket or cache_file_path(cwd, 'pytddmon.sock')
+        Daemon(pytddmon, socket_path).run()
+    elif not options.log_and_exit:
         TkGUI(pytddmon, import_tkinter(), import_tkFont()).run()
+    elif result_writer is not None:
+        pytddmon.main()
+        result_writer.close()
+        result_writer.stream.close()
     else:
         pytddmon.main()
 
-        outputfile = test_output or 'pytddmon.log'
+        outputfile = options.log_path or 'pytddmon.log'
         with open(outputfile, 'w') as log_file:
             log_file.write(
                 "green=%r\ntotal=%r\n" % (
@@ -694,6 +3841,10 @@ def run():
                     pytddmon.total_tests_run
                 )
             )
+            for duration, test_id in pytddmon.get_slowest_tests():
+                log_file.write("slow_test=%.3f %s\n" % (duration, test_id))
+            for duration, file_path, _timings in pytddmon.get_slowest_files():
+                log_file.write("slow_file=%.3f %s\n" % (duration, file_path))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,39 @@
+# coding: utf-8
+"""Fakes and fixtures shared by the tests"""
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class FakeMonitor:
+    """A monitor reporting the changes put in changed_files, if any"""
+
+    def __init__(self):
+        self.changed_files = set()
+
+    def look_for_changes(self):
+        return bool(self.changed_files)
+
+
+class TreeTestCase(unittest.TestCase):
+    """A test case with a temporary folder, root, to write files in"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def path(self, name):
+        """the path of name, a path below root with / as separator"""
+        return os.path.join(self.root, *name.split('/'))
+
+    def write(self, name, content='# content\n'):
+        """writes content to the file name below root, returns its path"""
+        path = self.path(name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
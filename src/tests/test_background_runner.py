@@ -0,0 +1,66 @@
+# coding: utf-8
+import threading
+import time
+import unittest
+
+from pytddmon import BackgroundRunner
+
+
+class FakePytddmon:
+    def __init__(self):
+        self.on_progress = None
+        self.look_during_run = True
+        self.cancel_requested = threading.Event()
+        self.may_finish = threading.Event()
+        self.changed_files = 'not run'
+
+    def run_tests(self, changed_files):
+        self.on_progress({'test': 'a', 'outcome': 'passed'})
+        self.may_finish.wait(5)
+        self.changed_files = changed_files
+
+
+class TestBackgroundRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.pytddmon = FakePytddmon()
+        self.runner = BackgroundRunner(self.pytddmon)
+
+    def wait_for_messages(self):
+        for _ in range(500):
+            messages = self.runner.take_messages()
+            if messages:
+                return messages
+            time.sleep(0.01)
+        return []
+
+    def test_engine_does_not_look_for_changes_itself(self):
+        self.assertFalse(self.pytddmon.look_during_run)
+
+    def test_progress_is_sent_while_running(self):
+        self.runner.start(None)
+        self.assertEqual(
+            [('progress', {'test': 'a', 'outcome': 'passed'})],
+            self.wait_for_messages()
+        )
+        self.assertTrue(self.runner.running)
+        self.pytddmon.may_finish.set()
+
+    def test_done_is_sent_at_the_end(self):
+        self.pytddmon.may_finish.set()
+        self.runner.start(set(['a.py']))
+        messages = self.wait_for_messages()
+        if len(messages) == 1:
+            messages += self.wait_for_messages()
+        self.assertEqual(('done', None), messages[-1])
+        self.assertFalse(self.runner.running)
+        self.assertEqual(set(['a.py']), self.pytddmon.changed_files)
+
+    def test_start_clears_earlier_cancel_request(self):
+        self.pytddmon.cancel_requested.set()
+        self.pytddmon.may_finish.set()
+        self.runner.start(None)
+        self.assertFalse(self.pytddmon.cancel_requested.is_set())
+
+if __name__ == '__main__':
+    unittest.main()
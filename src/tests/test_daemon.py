@@ -0,0 +1,127 @@
+# coding: utf-8
+import json
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from pytddmon import Daemon, Pytddmon
+from tests.helpers import FakeMonitor
+
+
+class Client(socket.socket):
+    pass
+
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.folder, 'pytddmon.sock')
+        pytddmon = Pytddmon(lambda: [], FakeMonitor())
+        self.daemon = Daemon(pytddmon, self.socket_path)
+        self.daemon.listen()
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        self.daemon.close()
+        shutil.rmtree(self.folder)
+
+    def connect(self):
+        client = Client(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(self.socket_path)
+        client.settimeout(0.01)
+        client.unread = b''
+        self.clients.append(client)
+        return client
+
+    def request(self, client, command):
+        client.sendall((json.dumps({'command': command}) + '\n').encode())
+
+    def read_message(self, client):
+        for _ in range(500):
+            if b'\n' in client.unread:
+                line, client.unread = client.unread.split(b'\n', 1)
+                return json.loads(line.decode())
+            self.daemon.step()
+            try:
+                client.unread += client.recv(65536)
+            except socket.timeout:
+                pass
+        self.fail('no message from daemon')
+
+    def test_status(self):
+        client = self.connect()
+        self.request(client, 'status')
+        status = self.read_message(client)
+        self.assertEqual(0, status['total'])
+        self.assertFalse(status['error'])
+        self.assertFalse(status['running'])
+        self.assertEqual([], status['modules'])
+
+    def test_log(self):
+        client = self.connect()
+        self.request(client, 'log')
+        self.assertIn('log', self.read_message(client))
+
+    def test_unknown_command_gives_error(self):
+        client = self.connect()
+        self.request(client, 'dance')
+        self.assertIn('error', self.read_message(client))
+
+    def test_bad_json_gives_error(self):
+        client = self.connect()
+        client.sendall(b'{not json\n')
+        self.assertIn('error', self.read_message(client))
+
+    def test_subscriber_hears_about_run(self):
+        client = self.connect()
+        self.request(client, 'subscribe')
+        self.assertEqual({'ok': True}, self.read_message(client))
+        self.request(client, 'run')
+        events = [self.read_message(client) for _ in range(3)]
+        self.assertEqual({'event': 'started'}, events[0])
+        self.assertEqual({'ok': True}, events[1])
+        self.assertEqual('done', events[2]['event'])
+        self.assertEqual(0, events[2]['status']['total'])
+
+    def test_refuses_to_start_when_another_daemon_listens(self):
+        other = Daemon(self.daemon.pytddmon, self.socket_path)
+        self.assertRaises(SystemExit, other.listen)
+
+    def test_stale_socket_is_replaced(self):
+        self.daemon.close()
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.socket_path)
+        stale.close()
+        self.daemon.listen()
+        client = self.connect()
+        self.request(client, 'status')
+        self.assertEqual(0, self.read_message(client)['total'])
+
+    def test_status_is_of_the_latest_finished_run(self):
+        pytddmon = self.daemon.pytddmon
+        pytddmon.results = {'test_a.py': ('test_a', 1, 2, '')}
+        pytddmon.total_tests_run = 2
+        client = self.connect()
+        self.request(client, 'status')
+        status = self.read_message(client)
+        self.assertEqual(0, status['total'])
+        self.assertEqual([], status['modules'])
+
+    def test_stalled_subscriber_is_disconnected(self):
+        client = self.connect()
+        self.request(client, 'subscribe')
+        self.read_message(client)
+        daemon_client = list(self.daemon.clients.values())[0]
+        daemon_client.max_outbox = 10
+        for _ in range(3):
+            self.daemon.publish({'event': 'started'})
+        self.daemon.step()
+        self.assertEqual({}, self.daemon.clients)
+
+if __name__ == '__main__':
+    unittest.main()
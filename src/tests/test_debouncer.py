@@ -0,0 +1,53 @@
+# coding: utf-8
+import unittest
+
+from pytddmon import Debouncer
+
+
+class TestDebouncer(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [100.0]
+        self.debouncer = Debouncer(0.5, clock=lambda: self.now[0])
+
+    def test_nothing_pending_at_start(self):
+        self.assertFalse(self.debouncer.is_pending())
+        self.assertFalse(self.debouncer.is_quiet())
+
+    def test_not_quiet_right_after_change(self):
+        self.debouncer.add(set(['a.py']))
+        self.assertTrue(self.debouncer.is_pending())
+        self.assertFalse(self.debouncer.is_quiet())
+
+    def test_quiet_after_quiet_period(self):
+        self.debouncer.add(set(['a.py']))
+        self.now[0] += 0.5
+        self.assertTrue(self.debouncer.is_quiet())
+
+    def test_new_change_restarts_quiet_period(self):
+        self.debouncer.add(set(['a.py']))
+        self.now[0] += 0.4
+        self.debouncer.add(set(['b.py']))
+        self.now[0] += 0.4
+        self.assertFalse(self.debouncer.is_quiet())
+        self.assertAlmostEqual(0.1, self.debouncer.seconds_until_quiet())
+
+    def test_burst_is_taken_at_once(self):
+        self.debouncer.add(set(['a.py']))
+        self.debouncer.add(set(['b.py']))
+        self.assertEqual(set(['a.py', 'b.py']), self.debouncer.take())
+        self.assertFalse(self.debouncer.is_pending())
+
+    def test_unknown_files_make_the_burst_unknown(self):
+        self.debouncer.add(set(['a.py']))
+        self.debouncer.add(None)
+        self.debouncer.add(set(['b.py']))
+        self.assertEqual(None, self.debouncer.take())
+
+    def test_no_quiet_period_is_quiet_at_once(self):
+        debouncer = Debouncer(0.0)
+        debouncer.add(set(['a.py']))
+        self.assertTrue(debouncer.is_quiet())
+
+if __name__ == '__main__':
+    unittest.main()
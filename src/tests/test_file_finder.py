@@ -0,0 +1,50 @@
+# coding: utf-8
+import unittest
+
+from pytddmon import FileFinder, wildcard_to_regex
+from tests.helpers import TreeTestCase
+
+
+class TestFileFinder(TreeTestCase):
+
+    def setUp(self):
+        TreeTestCase.setUp(self)
+        for name in ['test_a.py', 'notes.txt', 'package/test_b.py',
+                     '.git/hooks/hook.py', 'node_modules/x/setup.py',
+                     'env/pyvenv.cfg', 'env/lib/site.py', 'build/gen.py',
+                     'package/generated_c.py']:
+            self.write(name)
+
+    def find(self, **kwargs):
+        file_finder = FileFinder(self.root, wildcard_to_regex('*.py'), **kwargs)
+        return sorted(
+            file_finder.relative_path(path) for path in file_finder()
+        )
+
+    def test_finds_matching_files_outside_excluded_folders(self):
+        self.assertEqual(
+            ['build/gen.py', 'package/generated_c.py',
+             'package/test_b.py', 'test_a.py'],
+            self.find()
+        )
+
+    def test_exclude_globs_skip_files_and_folders(self):
+        self.assertEqual(
+            ['package/test_b.py', 'test_a.py'],
+            self.find(excludes=['build/', 'generated_*.py'])
+        )
+
+    def test_gitignore_is_used(self):
+        self.write('.gitignore', '# comment\n/build/\n!keep.py\n')
+        self.assertEqual(
+            ['package/generated_c.py', 'package/test_b.py', 'test_a.py'],
+            self.find(use_gitignore=True)
+        )
+
+    def test_regexp_must_match_whole_file_name(self):
+        file_finder = FileFinder(self.root, 'test_a.py|test_b')
+        self.assertTrue(file_finder.re_complete_match('test_a.py'))
+        self.assertFalse(file_finder.re_complete_match('test_b.py'))
+
+if __name__ == '__main__':
+    unittest.main()
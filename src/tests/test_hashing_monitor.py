@@ -0,0 +1,51 @@
+# coding: utf-8
+import os
+import unittest
+
+from pytddmon import ContentHasher, HashingMonitor
+from tests.helpers import FakeMonitor, TreeTestCase
+
+
+class TestHashingMonitor(TreeTestCase):
+
+    def setUp(self):
+        TreeTestCase.setUp(self)
+        self.cache_path = os.path.join(self.root, 'digests.json')
+        self.unit = self.write('unit.py', 'x = 1\n')
+        self.stat_monitor = FakeMonitor()
+        self.monitor = self._set_up_monitor()
+
+    def _set_up_monitor(self):
+        hasher = ContentHasher(self.cache_path)
+        return HashingMonitor(self.stat_monitor, lambda: [self.unit], hasher)
+
+    def test_touched_file_is_not_a_change(self):
+        os.utime(self.unit, (1, 1))
+        self.stat_monitor.changed_files = set([self.unit])
+        self.assertFalse(self.monitor.look_for_changes())
+
+    def test_changed_content_is_a_change(self):
+        self.write('unit.py', 'x = 2\n')
+        self.stat_monitor.changed_files = set([self.unit])
+        self.assertTrue(self.monitor.look_for_changes())
+        self.assertEqual(set([self.unit]), self.monitor.changed_files)
+
+    def test_removed_file_is_a_change(self):
+        os.remove(self.unit)
+        self.stat_monitor.changed_files = set([self.unit])
+        self.assertTrue(self.monitor.look_for_changes())
+
+    def test_new_file_is_a_change(self):
+        path = self.write('new.py', '')
+        self.stat_monitor.changed_files = set([path])
+        self.assertTrue(self.monitor.look_for_changes())
+
+    def test_digests_survive_restart(self):
+        hasher = ContentHasher(self.cache_path)
+        self.assertEqual(
+            ContentHasher().digest(self.unit),
+            hasher.digests[self.unit][2]
+        )
+
+if __name__ == '__main__':
+    unittest.main()
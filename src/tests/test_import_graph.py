@@ -0,0 +1,69 @@
+# coding: utf-8
+import os
+import unittest
+
+from pytddmon import ImportGraph
+from tests.helpers import TreeTestCase
+
+
+class TestImportGraph(TreeTestCase):
+
+    def setUp(self):
+        TreeTestCase.setUp(self)
+        self.write('unit.py', 'import os\n')
+        self.write('helper.py', 'from unit import something\n')
+        self.write('test_unit.py', 'import helper\n')
+        self.write('test_other.py', 'import unittest\n')
+        self.write('package/__init__.py', '')
+        self.write('package/core.py', 'from . import util\n')
+        self.write('package/util.py', '')
+        self.write('test_package.py', 'from package.core import thing\n')
+        self.graph = ImportGraph(self.root)
+
+    def affected(self, changed):
+        tests = [self.path(name) for name in
+                 ['test_unit.py', 'test_other.py', 'test_package.py']]
+        hit = self.graph.affected(tests, [self.path(name) for name in changed])
+        return sorted(os.path.basename(path) for path in hit)
+
+    def test_direct_imports_are_local_files_only(self):
+        self.assertEqual(
+            set([self.path('helper.py')]),
+            self.graph.direct_imports(self.path('test_unit.py'))
+        )
+
+    def test_change_in_test_file_affects_only_itself(self):
+        self.assertEqual(['test_other.py'], self.affected(['test_other.py']))
+
+    def test_transitive_import_is_affected(self):
+        self.assertEqual(['test_unit.py'], self.affected(['unit.py']))
+
+    def test_relative_import_in_package_is_followed(self):
+        self.assertEqual(['test_package.py'], self.affected(['package/util.py']))
+
+    def test_package_init_is_a_dependency(self):
+        self.assertEqual(
+            ['test_package.py'],
+            self.affected(['package/__init__.py'])
+        )
+
+    def test_unrelated_change_affects_nothing(self):
+        self.write('other.py', '')
+        self.assertEqual([], self.affected(['other.py']))
+
+    def test_deleted_module_affects_its_importers(self):
+        self.graph.importers([self.path('test_unit.py')])
+        os.remove(self.path('unit.py'))
+        self.assertEqual(['test_unit.py'], self.affected(['unit.py']))
+
+    def test_renamed_package_affects_its_importers(self):
+        self.graph.importers([self.path('test_package.py')])
+        os.rename(self.path('package'), self.path('renamed'))
+        self.assertEqual(['test_package.py'], self.affected(['package']))
+
+    def test_syntax_error_imports_nothing(self):
+        self.write('test_unit.py', 'import helper\ndef broken(\n')
+        self.assertEqual(set(), self.graph.direct_imports(self.path('test_unit.py')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# coding: utf-8
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from pytddmon import ImportProfile, ImportTimer
+
+
+class TestImportTimer(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for name, content in [
+            ('outer_module.py', 'import inner_module\n'),
+            ('inner_module.py', 'import time\ntime.sleep(0.01)\n'),
+        ]:
+            with open(os.path.join(self.folder, name), 'w') as f:
+                f.write(content)
+        sys.path.insert(0, self.folder)
+        self.timer = ImportTimer()
+        sys.meta_path.insert(0, self.timer)
+
+    def tearDown(self):
+        sys.meta_path.remove(self.timer)
+        sys.path.remove(self.folder)
+        for name in ('outer_module', 'inner_module'):
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.folder)
+
+    @unittest.skipUnless(hasattr(sys, 'implementation'),
+                         'meta path finders with find_spec need Python 3.4')
+    def test_nested_imports_are_timed(self):
+        __import__('outer_module')
+        timings = self.timer.take()
+        outer_cumulative, outer_self, outer_parent = timings['outer_module']
+        inner_cumulative, _inner_self, inner_parent = timings['inner_module']
+        self.assertEqual(None, outer_parent)
+        self.assertEqual('outer_module', inner_parent)
+        self.assertTrue(inner_cumulative >= 0.01)
+        self.assertTrue(outer_cumulative >= inner_cumulative)
+        self.assertTrue(outer_self < inner_cumulative)
+        self.assertEqual({}, self.timer.take())
+
+
+    @unittest.skipUnless(hasattr(sys, 'implementation'),
+                         'meta path finders with find_spec need Python 3.4')
+    def test_modules_keep_their_own_loader(self):
+        __import__('outer_module')
+        module = sys.modules['outer_module']
+        self.assertEqual('SourceFileLoader', type(module.__loader__).__name__)
+        self.assertIs(module.__loader__, module.__spec__.loader)
+
+class TestImportProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.profile = ImportProfile()
+        self.profile.add({
+            'test_a': (0.5, 0.1, None),
+            'slow': (0.4, 0.4, 'test_a'),
+            'fast': (0.0001, 0.0001, 'test_a'),
+        })
+        self.profile.add({'slow': (0.2, 0.2, 'test_b')})
+
+    def test_report_is_a_tree(self):
+        self.assertEqual(
+            "\nImport times in seconds (cumulative, self, module):\n"
+            "     0.500    0.100  test_a\n"
+            "     0.600    0.600    slow (2 times)\n"
+            "  (1 imports faster than 0.001 seconds not shown)\n",
+            self.profile.report()
+        )
+
+    def test_json_has_slowest_first(self):
+        self.assertEqual(
+            ['slow', 'test_a', 'fast'],
+            [module['module'] for module in self.profile.to_json()]
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# coding: utf-8
+import os
+import unittest
+
+from pytddmon import (
+    FileFinder, InotifyMonitor, can_use_inotify, decode_file_name,
+    wildcard_to_regex)
+from tests.helpers import TreeTestCase
+
+
+@unittest.skipUnless(can_use_inotify(), 'needs inotify')
+class TestInotifyMonitor(TreeTestCase):
+
+    def setUp(self):
+        TreeTestCase.setUp(self)
+        self.write('test_existing.py')
+        file_finder = FileFinder(self.root, wildcard_to_regex('*.py'))
+        self.monitor = InotifyMonitor(file_finder)
+
+    def tearDown(self):
+        self.monitor.inotify.close()
+        TreeTestCase.tearDown(self)
+
+    def test_nothing_changed(self):
+        self.assertFalse(self.monitor.look_for_changes())
+
+    def test_written_file_is_reported(self):
+        path = self.write('test_existing.py')
+        self.assertTrue(self.monitor.look_for_changes())
+        self.assertEqual(set([path]), self.monitor.changed_files)
+
+    def test_change_is_only_detected_once(self):
+        self.write('test_existing.py')
+        self.monitor.look_for_changes()
+        self.assertFalse(self.monitor.look_for_changes())
+
+    def test_not_matching_file_is_ignored(self):
+        self.write('notes.txt')
+        self.assertFalse(self.monitor.look_for_changes())
+
+    def test_files_in_new_folder_are_watched(self):
+        os.mkdir(os.path.join(self.root, 'package'))
+        self.monitor.look_for_changes()
+        path = self.write(os.path.join('package', 'test_new.py'))
+        self.assertTrue(self.monitor.look_for_changes())
+        self.assertEqual(set([path]), self.monitor.changed_files)
+
+    def test_excluded_folders_are_ignored(self):
+        os.mkdir(os.path.join(self.root, '__pycache__'))
+        os.mkdir(os.path.join(self.root, '.pytddmon_cache'))
+        self.assertFalse(self.monitor.look_for_changes())
+
+    def test_removed_file_is_reported(self):
+        path = os.path.join(self.root, 'test_existing.py')
+        os.remove(path)
+        self.assertTrue(self.monitor.look_for_changes())
+        self.assertEqual(set([path]), self.monitor.changed_files)
+
+    @unittest.skipUnless(hasattr(os, 'fsencode'), 'needs Python 3')
+    def test_file_name_not_in_file_system_encoding_is_reported(self):
+        root = os.fsencode(self.root)
+        with open(os.path.join(root, b'test_\xff.py'), 'w') as f:
+            f.write('# content\n')
+        self.assertTrue(self.monitor.look_for_changes())
+        self.assertEqual(
+            set([os.path.join(self.root, decode_file_name(b'test_\xff.py'))]),
+            self.monitor.changed_files
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+# coding: utf-8
+import unittest
+
+from pytddmon import RunLog, TkLogView
+
+
+class FakeTkinter:
+    NORMAL = 'normal'
+    DISABLED = 'disabled'
+    END = 'end'
+
+
+class FakeText:
+    """Enough of a tk Text widget for TkLogView: characters with tags, where
+    indexes are offsets"""
+
+    def __init__(self):
+        self.chars = []  # (char, tags)
+        self.options = {}
+        self.tag_options = {}
+        self.bindings = {}
+        self.inserted = 0
+
+    def __setitem__(self, key, value):
+        self.options[key] = value
+
+    def index(self, index):
+        if index == 'end':
+            return len(self.chars)
+        if index == '1.0':
+            return 0
+        return index
+
+    def insert(self, index, *chars_and_tags):
+        assert self.options['state'] == 'normal'
+        position = self.index(index)
+        for chars, tags in zip(chars_and_tags[::2], chars_and_tags[1::2]):
+            self.inserted += len(chars)
+            for char in chars:
+                self.chars.insert(position, (char, set(tags)))
+                position += 1
+
+    def delete(self, start, end):
+        assert self.options['state'] == 'normal'
+        del self.chars[self.index(start):self.index(end)]
+
+    def tag_ranges(self, tag):
+        positions = [i for i, (_char, tags) in enumerate(self.chars)
+                     if tag in tags]
+        if not positions:
+            return ()
+        return positions[0], positions[-1] + 1
+
+    def tag_configure(self, tag, **options):
+        self.tag_options.setdefault(tag, {}).update(options)
+
+    def tag_bind(self, tag, sequence, callback):
+        self.bindings[tag] = callback
+
+    def tag_delete(self, *tags):
+        for tag in tags:
+            self.tag_options.pop(tag, None)
+            self.bindings.pop(tag, None)
+
+    def get(self):
+        return ''.join(char for char, _tags in self.chars)
+
+
+def run_log(*modules):
+    log = RunLog()
+    log.add_line("Header")
+    for module in modules:
+        log.add_module(*module)
+    return log
+
+
+class TestTkLogView(unittest.TestCase):
+
+    def setUp(self):
+        self.text = FakeText()
+        self.view = TkLogView(FakeTkinter(), self.text)
+
+    def show(self, log):
+        self.text.inserted = 0
+        self.view.show(log)
+        self.assertEqual(log.render(), self.text.get())
+
+    def test_shows_the_log(self):
+        self.show(run_log(('a', 1, 1, 'ok a\n'), ('b', 0, 1, 'bad b\n')))
+
+    def test_only_changed_sections_are_replaced(self):
+        self.show(run_log(('a', 1, 1, 'ok a\n'), ('b', 1, 1, 'ok b\n')))
+        self.show(run_log(('a', 1, 1, 'ok a\n'), ('b', 1, 1, 'OK B\n')))
+        self.assertEqual(len("\nLog from b:\nOK B\n"), self.text.inserted)
+
+    def test_section_moves_first_when_failing(self):
+        self.show(run_log(('a', 1, 1, 'ok a\n'), ('b', 1, 1, 'ok b\n')))
+        self.show(run_log(('a', 1, 1, 'ok a\n'), ('b', 0, 1, 'bad b\n')))
+
+    def test_removed_modules_are_removed(self):
+        self.show(run_log(('a', 1, 1, 'ok a\n'), ('b', 1, 1, 'ok b\n')))
+        self.show(run_log(('b', 1, 1, 'ok b\n')))
+
+    def test_header_changes_are_shown(self):
+        self.show(run_log(('a', 1, 1, 'ok a\n')))
+        log = run_log(('a', 1, 1, 'ok a\n'))
+        log.add_line("More")
+        self.show(log)
+
+    def test_note_about_left_out_modules_is_shown(self):
+        log = RunLog(max_size=40)
+        log.add_module('a', 0, 1, 'x' * 20)
+        log.add_module('b', 0, 1, 'y' * 20)
+        self.show(log)
+        self.show(run_log(('a', 1, 1, 'ok a\n')))
+
+    def test_clicking_a_title_collapses_the_section(self):
+        self.show(run_log(('a', 0, 1, 'bad a\n')))
+        self.text.bindings['title-a'](None)
+        self.assertTrue(self.text.tag_options['body-a']['elide'])
+        self.text.bindings['title-a'](None)
+        self.assertFalse(self.text.tag_options['body-a']['elide'])
+
+    def test_collapsed_sections_stay_collapsed(self):
+        self.show(run_log(('a', 0, 1, 'bad a\n')))
+        self.view.toggle('a')
+        self.show(run_log(('a', 0, 1, 'still bad a\n')))
+        self.assertTrue(self.text.tag_options['body-a']['elide'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -73,5 +73,11 @@ class TestChangeDetection(unittest.TestCase):
         change_detected = monitor.look_for_changes()
         assert not change_detected
 
+    def test_changed_files_are_reported(self):
+        files, monitor = self._set_up_monitor()
+        files[:] = ['file', 'added']
+        monitor.look_for_changes()
+        self.assertEqual(set(['added']), monitor.changed_files)
+
 if __name__ == '__main__':
     unittest.main()
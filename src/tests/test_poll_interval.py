@@ -0,0 +1,28 @@
+# coding: utf-8
+import unittest
+
+from pytddmon import PollInterval
+
+
+class TestPollInterval(unittest.TestCase):
+
+    def setUp(self):
+        self.interval = PollInterval(minimum=0.5, maximum=2.0, factor=2)
+
+    def test_starts_short(self):
+        self.assertEqual(500, self.interval.milliseconds())
+
+    def test_grows_while_idle_up_to_maximum(self):
+        seconds = []
+        for _ in range(4):
+            self.interval.back_off()
+            seconds.append(self.interval.seconds)
+        self.assertEqual([1.0, 2.0, 2.0, 2.0], seconds)
+
+    def test_reset_after_changes(self):
+        self.interval.back_off()
+        self.interval.reset()
+        self.assertEqual(0.5, self.interval.seconds)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+# coding: utf-8
+import multiprocessing
+import sys
+import unittest
+
+from pytddmon import PoolFactory, can_use_forkserver
+
+
+def is_imported(module_name):
+    return module_name in sys.modules
+
+
+@unittest.skipIf(multiprocessing.current_process().daemon,
+                 'daemonic processes, like the workers of pytddmon, '
+                 'cannot start pools')
+class TestPoolFactory(unittest.TestCase):
+
+    def _map_with(self, pool_factory):
+        pool = pool_factory(processes=1)
+        try:
+            return pool.map(abs, [-1, -2])
+        finally:
+            pool.close()
+            pool.join()
+
+    def test_without_preload_uses_plain_pool(self):
+        pool_factory = PoolFactory()
+        self.assertEqual(None, pool_factory.context)
+        self.assertEqual([1, 2], self._map_with(pool_factory))
+
+    @unittest.skipUnless(can_use_forkserver(), 'needs forkserver')
+    def test_preload_forks_workers_from_warm_parent(self):
+        pool_factory = PoolFactory(['colorsys'])
+        self.assertNotEqual(None, pool_factory.context)
+        self.assertEqual([1, 2], self._map_with(pool_factory))
+        pool = pool_factory(processes=1)
+        try:
+            self.assertTrue(pool.apply(is_imported, ('colorsys',)))
+        finally:
+            pool.close()
+            pool.join()
+
+if __name__ == '__main__':
+    unittest.main()
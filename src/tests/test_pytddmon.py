@@ -11,7 +11,8 @@ import sys
 sys.path.append('..')
 
 import unittest
-from pytddmon import Pytddmon
+from pytddmon import Pytddmon, merge_shard_results, run_module
+from tests.helpers import FakeMonitor
 
 
 class TestPytddmonMonitorCommunication(unittest.TestCase):
@@ -61,5 +62,204 @@ class TestPytddmonMonitorCommunication(unittest.TestCase):
         pytddmon = self._set_up_pytddmon([False])
         self.assertEqual(0, pytddmon.total_tests_run)
 
+
+class TestScheduling(unittest.TestCase):
+    def _set_up_pytddmon(self):
+        return Pytddmon(lambda: [], FakeMonitor(), jobs=4)
+
+    def test_slowest_files_are_scheduled_first(self):
+        pytddmon = self._set_up_pytddmon()
+        pytddmon.durations = {'fast.py': 0.1, 'slow.py': 2.0}
+        self.assertEqual(
+            ['slow.py', 'fast.py'],
+            pytddmon.schedule(['fast.py', 'slow.py'])
+        )
+
+    def test_files_without_history_are_scheduled_first(self):
+        pytddmon = self._set_up_pytddmon()
+        pytddmon.durations = {'slow.py': 2.0}
+        self.assertEqual(
+            ['new.py', 'slow.py'],
+            pytddmon.schedule(['slow.py', 'new.py'])
+        )
+
+
+class TestProgress(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.pytddmon = Pytddmon(lambda: [], FakeMonitor())
+        self.pytddmon.on_progress = self.events.append
+
+    def test_finished_tests_are_counted(self):
+        for outcome in ['started', 'passed', 'started', 'failed', 'skipped']:
+            self.pytddmon.handle_event(
+                {'file': 'test.py', 'test': 't', 'outcome': outcome})
+        self.assertEqual(3, self.pytddmon.tests_run_so_far)
+        self.assertEqual(2, self.pytddmon.tests_passed_so_far)
+        self.assertEqual(5, len(self.events))
+
+    def test_counting_starts_from_files_not_run_again(self):
+        self.pytddmon.results = {
+            'kept.py': ('kept', 2, 3, ''),
+            'rerun.py': ('rerun', 1, 1, ''),
+        }
+        self.pytddmon.count_tests_so_far(['rerun.py'])
+        self.assertEqual(3, self.pytddmon.tests_run_so_far)
+        self.assertEqual(2, self.pytddmon.tests_passed_so_far)
+
+
+class TestFailFast(unittest.TestCase):
+    def setUp(self):
+        self.pytddmon = Pytddmon(lambda: [], FakeMonitor(), fail_fast=True)
+        self.pytddmon.failed_tests = {'test.py': set(['t.known'])}
+
+    def record_failure(self, test_id):
+        self.pytddmon.handle_event(
+            {'file': 'test.py', 'test': test_id, 'outcome': 'failed'})
+
+    def test_known_failure_does_not_stop_the_run(self):
+        self.record_failure('t.known')
+        self.assertEqual(None, self.pytddmon.new_failure_file)
+
+    def test_new_failure_stops_the_run(self):
+        self.record_failure('t.new')
+        self.assertEqual('test.py', self.pytddmon.new_failure_file)
+
+    def test_failures_are_noted(self):
+        self.record_failure('t.known')
+        self.record_failure('t.new')
+        self.assertEqual(
+            {'test.py': set(['t.known', 't.new'])},
+            self.pytddmon.failures_in_run
+        )
+
+
+class TestFailuresOnly(unittest.TestCase):
+    def setUp(self):
+        self.pytddmon = Pytddmon(
+            lambda: [], FakeMonitor(), failures_first=True,
+            failures_only=True)
+        self.pytddmon.results = {
+            'a.py': ('a', 3, 5, 'FAIL: a.x\nFAIL: a.y\n'),
+            'b.py': ('b', 2, 2, ''),
+        }
+        self.jobs_run = []
+        self.pytddmon.run_jobs = self.run_jobs
+        self.pytddmon.file_finder = lambda: ['a.py', 'b.py']
+
+    def run_jobs(self, jobs):
+        self.jobs_run.extend(jobs)
+        return []
+
+    def rerun_failing_tests(self, file_paths):
+        self.pytddmon.failures_in_run = {'a.py': set(['a.y'])}
+        return {'a.py': ('a', 1, 2, 'FAIL: a.y\n')}
+
+    def test_other_tests_are_not_run_while_failures_remain(self):
+        self.pytddmon.rerun_failing_tests = self.rerun_failing_tests
+        self.pytddmon.run_tests()
+        self.assertEqual([], self.jobs_run)
+        self.assertEqual(
+            ('a', 4, 5, 'FAIL: a.y\n'), self.pytddmon.results['a.py'])
+        self.assertEqual(set(['a.y']), self.pytddmon.failed_tests['a.py'])
+        self.assertEqual((6, 7), (self.pytddmon.total_tests_passed,
+                                  self.pytddmon.total_tests_run))
+
+    def test_other_tests_are_run_when_failures_are_fixed(self):
+        self.pytddmon.rerun_failing_tests = lambda file_paths: {}
+        self.pytddmon.run_tests()
+        self.assertEqual(
+            ['a.py', 'b.py'], sorted(job[0] for job in self.jobs_run))
+
+
+class TestTimings(unittest.TestCase):
+    def setUp(self):
+        self.pytddmon = Pytddmon(lambda: [], FakeMonitor(), slowest=2)
+
+    def test_test_durations_are_noted(self):
+        for test_id, duration in [('t.a', 0.1), ('t.b', 0.3)]:
+            self.pytddmon.handle_event({
+                'file': 'test.py', 'test': test_id, 'outcome': 'passed',
+                'duration': duration})
+        self.assertEqual(
+            {'test.py': {'t.a': 0.1, 't.b': 0.3}},
+            self.pytddmon.test_durations_in_run
+        )
+
+    def test_slowest_tests_come_first(self):
+        self.pytddmon.test_durations = {
+            'a.py': {'a.fast': 0.1, 'a.slow': 2.0},
+            'b.py': {'b.medium': 1.0},
+        }
+        self.assertEqual(
+            [(2.0, 'a.slow'), (1.0, 'b.medium')],
+            self.pytddmon.get_slowest_tests()
+        )
+
+    def test_report_shows_phases_of_slowest_files(self):
+        self.pytddmon.timings = {
+            'a.py': {'duration': 1.5, 'import': 1.0, 'collect': 0.1,
+                     'execute': 0.4},
+        }
+        self.assertIn(
+            "1.500s a.py (1.000 + 0.100 + 0.400)",
+            self.pytddmon.get_slowest_report()
+        )
+
+    def test_run_module_times_its_phases(self):
+        timings = {}
+        run_module('tests.test_pytddmon', ['no.such.test'], timings=timings)
+        self.assertEqual(
+            ['collect', 'execute', 'import'],
+            sorted(timings)
+        )
+
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.pytddmon = Pytddmon(lambda: [], FakeMonitor(), jobs=2)
+        self.pytddmon.test_durations = {
+            'big.py': {'t.a': 3.0, 't.b': 2.0, 't.c': 1.0, 't.d': 1.5},
+            'small.py': {'t.e': 0.1},
+        }
+
+    def test_slow_files_are_split_by_duration(self):
+        jobs, shard_counts = self.pytddmon.make_jobs(['big.py', 'small.py'])
+        self.assertEqual({'big.py': 2}, shard_counts)
+        self.assertEqual([
+            ('big.py', None, False, ['t.b', 't.d']),
+            ('big.py', ['t.b', 't.d'], False, None),
+            ('small.py', None, False, None),
+        ], jobs)
+
+    def test_files_are_not_split_when_running_one_job(self):
+        self.pytddmon.jobs = 1
+        jobs, shard_counts = self.pytddmon.make_jobs(['big.py'])
+        self.assertEqual({}, shard_counts)
+        self.assertEqual([('big.py', None, False, None)], jobs)
+
+    def test_excluded_tests_are_not_run(self):
+        result = run_module(
+            'tests.test_poll_interval',
+            excluded_ids=['tests.test_poll_interval.TestPollInterval'
+                          '.test_starts_short']
+        )
+        self.assertEqual(2, result[2])
+
+    def test_shard_results_are_merged(self):
+        result, info = merge_shard_results([
+            (('big', 2, 2, 'All 2 tests passed\n'), {'duration': 1.0}),
+            (('big', 1, 2, 'FAIL: t.c\n'), {'duration': 2.0}),
+        ])
+        self.assertEqual(('big', 3, 4, 'FAIL: t.c\n'), result)
+        self.assertEqual({'duration': 3.0}, info)
+
+    def test_passing_shard_results_are_merged(self):
+        result, _info = merge_shard_results([
+            (('big', 2, 2, 'All 2 tests passed\n'), {}),
+            (('big', 1, 1, 'All 1 tests passed\n'), {}),
+        ])
+        self.assertEqual(('big', 3, 3, 'All 3 tests passed\n'), result)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,75 @@
+# coding: utf-8
+import os
+import unittest
+
+from pytddmon import ContentHasher, ImportGraph, Pytddmon, ResultCache
+from tests.helpers import FakeMonitor, TreeTestCase
+
+
+class TestResultCache(TreeTestCase):
+
+    def setUp(self):
+        TreeTestCase.setUp(self)
+        self.unit = self.write('unit.py', 'x = 1\n')
+        self.test = self.write('test_unit.py', 'import unit\n')
+        self.cache = self._set_up_cache()
+
+    def _set_up_cache(self, max_bytes=1024 ** 2):
+        return ResultCache(
+            os.path.join(self.root, 'results'),
+            ContentHasher(),
+            ImportGraph(self.root),
+            max_bytes=max_bytes
+        )
+
+    def test_stored_result_is_found(self):
+        key = self.cache.key(self.test)
+        self.cache.put(key, ('test_unit', 1, 1, 'All 1 tests passed\n'))
+        self.assertEqual(
+            ('test_unit', 1, 1, 'All 1 tests passed\n'),
+            self._set_up_cache().get(self._set_up_cache().key(self.test))
+        )
+
+    def test_changed_import_changes_key(self):
+        key = self.cache.key(self.test)
+        self.write('unit.py', 'x = 22\n')
+        self.assertNotEqual(key, self._set_up_cache().key(self.test))
+
+    def test_unrelated_change_keeps_key(self):
+        key = self.cache.key(self.test)
+        self.write('other.py', 'y = 1\n')
+        self.assertEqual(key, self._set_up_cache().key(self.test))
+
+    def test_errors_are_not_stored(self):
+        key = self.cache.key(self.test)
+        self.cache.put(key, ('Exception(test_unit.py)', 0, 1j, 'Traceback'))
+        self.assertEqual(None, self.cache.get(key))
+
+    def test_least_recently_used_results_are_evicted(self):
+        cache = self._set_up_cache(max_bytes=100)
+        cache.put('old', ('old', 1, 1, 'x' * 60))
+        os.utime(cache.entry_path('old'), (1, 1))
+        cache.put('new', ('new', 1, 1, 'x' * 60))
+        cache.save()
+        self.assertEqual(None, cache.get('old'))
+        self.assertNotEqual(None, cache.get('new'))
+
+    def test_reused_results_are_written(self):
+        self.cache.put(self.cache.key(self.test), ('test_unit', 1, 1, ''))
+        records = []
+        pytddmon = Pytddmon(lambda: [], FakeMonitor(), result_cache=self.cache)
+        pytddmon.result_writer = FakeResultWriter(records)
+        self.assertEqual(([], {}), pytddmon.reuse_cached_results([self.test]))
+        self.assertEqual(
+            [(self.test, ('test_unit', 1, 1, ''), {'cached': True})], records)
+
+
+class FakeResultWriter:
+    def __init__(self, records):
+        self.records = records
+
+    def write_file(self, file_path, result, info):
+        self.records.append((file_path, result, info))
+
+if __name__ == '__main__':
+    unittest.main()
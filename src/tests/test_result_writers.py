@@ -0,0 +1,72 @@
+# coding: utf-8
+import io
+import json
+import unittest
+import xml.dom.minidom
+
+from pytddmon import JsonLinesWriter, JsonWriter, JUnitWriter
+
+
+class Stream(io.StringIO):
+    def write(self, text):
+        return io.StringIO.write(self, u'' + text)
+
+
+PASSED = {'file': 'test_a.py', 'test': 'test_a.T.test_ok', 'outcome': 'passed',
+          'duration': 0.5, 'traceback': None}
+FAILED = {'file': 'test_a.py', 'test': 'test_a.T.test_bad', 'outcome': 'failed',
+          'duration': 0.25, 'traceback': 'AssertionError: 1 < 2'}
+ERROR_RESULT = ('Exception(test_b.py)', 0, 1j, 'ImportError: b')
+
+
+class TestResultWriters(unittest.TestCase):
+
+    def write_results(self, writer_class):
+        stream = Stream()
+        writer = writer_class(stream)
+        writer.write_test(PASSED)
+        writer.write_test(FAILED)
+        writer.write_file('test_a.py', ('test_a', 1, 2, 'log'), {'duration': 1.0})
+        writer.write_file('test_b.py', ERROR_RESULT, {'duration': 0.1})
+        writer.write_file('test_c.py', ('test_c', 3, 3, ''), {'cached': True})
+        writer.close()
+        return stream.getvalue()
+
+    def test_json_lines(self):
+        records = [json.loads(line) for line in
+                   self.write_results(JsonLinesWriter).splitlines()]
+        self.assertEqual(
+            ['passed', 'failed', 'failed', 'error', 'passed'],
+            [record['outcome'] for record in records]
+        )
+        self.assertEqual(
+            [False, True], [record['cached'] for record in records[3:]])
+        self.assertEqual('AssertionError: 1 < 2', records[1]['traceback'])
+        self.assertEqual(1, records[2]['green'])
+        self.assertEqual(2, records[2]['total'])
+
+    def test_json(self):
+        records = json.loads(self.write_results(JsonWriter))
+        self.assertEqual(
+            ['test', 'test', 'file', 'file', 'file'],
+            [record['type'] for record in records]
+        )
+
+    def test_json_without_records(self):
+        stream = Stream()
+        JsonWriter(stream).close()
+        self.assertEqual([], json.loads(stream.getvalue()))
+
+    def test_junit(self):
+        document = xml.dom.minidom.parseString(self.write_results(JUnitWriter))
+        testcases = document.getElementsByTagName('testcase')
+        self.assertEqual(
+            ['test_ok', 'test_bad', 'Exception(test_b.py)', 'test_c'],
+            [testcase.getAttribute('name') for testcase in testcases]
+        )
+        self.assertEqual('test_a.T', testcases[0].getAttribute('classname'))
+        self.assertEqual(1, len(document.getElementsByTagName('failure')))
+        self.assertEqual(1, len(document.getElementsByTagName('error')))
+
+if __name__ == '__main__':
+    unittest.main()
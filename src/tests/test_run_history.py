@@ -0,0 +1,76 @@
+# coding: utf-8
+import os
+import shutil
+import tempfile
+import unittest
+
+from pytddmon import RunHistory
+
+
+class TestRunHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.test_file = os.path.join(self.folder, 'test_a.py')
+        open(self.test_file, 'w').close()
+        self.history = RunHistory(os.path.join(self.folder, 'history.sqlite'))
+        self.run_number = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def record(self, file_seconds, test_outcomes, file_path=None):
+        self.run_number += 1
+        file_path = file_path or self.test_file
+        total = len(test_outcomes)
+        green = sum(1 for _, outcome, _ in test_outcomes
+                    if outcome == 'passed')
+        self.history.record(
+            self.run_number * 60.0, file_seconds, [file_path], False,
+            green, total,
+            [(file_path, ('test_a', green, total, ''), file_seconds)],
+            [(test_id, file_path, outcome, seconds)
+             for test_id, outcome, seconds in test_outcomes]
+        )
+
+    def test_latest_durations_are_used(self):
+        self.record(1.0, [('a.t', 'passed', 0.5)])
+        self.record(2.0, [('a.t', 'passed', 1.5)])
+        self.assertEqual(
+            ({self.test_file: 2.0}, {self.test_file: {'a.t': 1.5}}),
+            self.history.latest_durations()
+        )
+
+    def test_durations_of_removed_files_are_left_out(self):
+        self.record(1.0, [('gone.t', 'passed', 0.5)],
+                    os.path.join(self.folder, 'test_gone.py'))
+        self.assertEqual(({}, {}), self.history.latest_durations())
+
+    def test_report_shows_tests_that_got_slower(self):
+        for seconds in [0.1] * RunHistory.window + [0.5] * RunHistory.window:
+            self.record(seconds, [('a.slower', 'passed', seconds),
+                                  ('a.same', 'passed', 0.1)])
+        report = self.history.report()
+        self.assertIn("   0.100    0.500  a.slower", report)
+        self.assertNotIn("a.same", report)
+
+    def test_report_shows_flaky_tests(self):
+        for outcome in ['passed', 'failed', 'passed', 'passed']:
+            self.record(0.1, [('a.flaky', outcome, 0.1),
+                              ('a.broken', 'failed', 0.1)])
+        report = self.history.report()
+        self.assertIn("    2     4  a.flaky", report)
+        self.assertNotIn("a.broken", report)
+
+    def test_runs_keep_the_totals_of_the_suite(self):
+        self.history.record(
+            60.0, 1.0, [self.test_file], False, 9, 10 + 1j,
+            [(self.test_file, ('test_a', 1, 1, ''), 1.0)], [])
+        self.assertEqual(
+            [(9, 10, 1)],
+            self.history.execute(lambda db: db.execute(
+                "SELECT green, total, errors FROM runs").fetchall())
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+# coding: utf-8
+import unittest
+
+from pytddmon import RunLog
+
+
+class TestRunLog(unittest.TestCase):
+
+    def test_failing_modules_come_first(self):
+        log = RunLog()
+        log.add_line("Header")
+        log.add_module('passing', 1, 1, 'All 1 tests passed\n')
+        log.add_module('failing', 0, 1, 'FAIL\n')
+        log.add_module('broken', 0, 1j, 'Traceback\n')
+        self.assertEqual(
+            "Header\n\n"
+            "\nLog from failing:\nFAIL\n"
+            "\nLog from broken:\nTraceback\n"
+            "\nLog from passing:\nAll 1 tests passed\n",
+            log.render()
+        )
+
+    def test_long_module_logs_are_shortened(self):
+        log = RunLog(max_section_size=10)
+        log.add_module('failing', 0, 1, 'a' * 5 + 'b' * 100 + 'c' * 5)
+        self.assertIn(
+            "aaaaa\n... 100 characters left out ...\nccccc",
+            log.render()
+        )
+
+    def test_modules_beyond_the_size_limit_are_left_out(self):
+        log = RunLog(max_size=50)
+        log.add_module('first', 0, 1, 'x' * 20)
+        log.add_module('second', 0, 1, 'y' * 20)
+        text = log.render()
+        self.assertIn('first', text)
+        self.assertNotIn('second', text)
+        self.assertIn('1 more modules are left out', text)
+
+    def test_render_is_kept_until_changed(self):
+        log = RunLog()
+        self.assertTrue(log.render() is log.render())
+        log.add_line("More")
+        self.assertIn("More", log.render())
+
+if __name__ == '__main__':
+    unittest.main()
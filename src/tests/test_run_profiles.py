@@ -0,0 +1,80 @@
+# coding: utf-8
+import os
+import shutil
+import tempfile
+import unittest
+
+from pytddmon import RunProfiles, WorkerProfiler, collapsed_stacks
+
+OUTER = ('outer.py', 1, 'outer')
+INNER = ('inner.py', 2, 'inner')
+OTHER = ('other.py', 3, 'other')
+
+
+class TestCollapsedStacks(unittest.TestCase):
+
+    def test_time_is_shared_among_call_sites(self):
+        stats = {
+            # function: (cc, nc, tottime, cumtime, {caller: edge})
+            OUTER: (1, 1, 0.1, 1.0, {}),
+            OTHER: (1, 1, 0.0, 0.2, {}),
+            INNER: (2, 2, 1.0, 1.0, {
+                OUTER: (1, 1, 0.8, 0.8),
+                OTHER: (1, 1, 0.2, 0.2),
+            }),
+        }
+        self.assertEqual([
+            ('other.py:3(other);inner.py:2(inner)', 200000),
+            ('outer.py:1(outer)', 100000),
+            ('outer.py:1(outer);inner.py:2(inner)', 800000),
+        ], collapsed_stacks(stats))
+
+    def test_recursion_ends(self):
+        stats = {
+            OUTER: (1, 1, 0.1, 1.0, {}),
+            INNER: (5, 1, 0.9, 0.9, {OUTER: (1, 1, 0.2, 0.9),
+                                     INNER: (4, 4, 0.7, 0.7)}),
+        }
+        self.assertEqual(2, len(collapsed_stacks(stats)))
+
+
+class TestRunProfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.profiles = RunProfiles(self.folder, 'tests.*')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def profile_run(self):
+        run_folder = self.profiles.start_run()
+        profiler = WorkerProfiler('tests.*', run_folder)
+        profiler.start('tests.test_a.T.test_a')
+        sorted(range(1000))
+        profiler.stop()
+        profiler.start('other.T.test_b')
+        profiler.stop()
+        profiler.save()
+        return self.profiles.finish_run()
+
+    def test_worker_profiles_are_merged(self):
+        run_folder = self.profile_run()
+        self.assertEqual(
+            ['profile.collapsed', 'profile.pstats'],
+            sorted(os.listdir(run_folder))
+        )
+
+    def test_runs_without_profiled_tests_leave_nothing(self):
+        self.profiles.start_run()
+        self.assertEqual(None, self.profiles.finish_run())
+        self.assertEqual([], os.listdir(self.folder))
+
+    def test_only_the_last_runs_are_kept(self):
+        self.profiles.max_runs = 2
+        for _ in range(3):
+            self.profile_run()
+        self.assertEqual(2, len(os.listdir(self.folder)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# coding: utf-8
+import os
+import shutil
+import unittest
+
+from pytddmon import FileFinder, ScanningMonitor, wildcard_to_regex
+from tests.helpers import TreeTestCase
+
+
+class CountingScanningMonitor(ScanningMonitor):
+    racy_seconds = 0
+
+    def read_folder(self, folder):
+        self.folders_read.append(folder)
+        return ScanningMonitor.read_folder(self, folder)
+
+
+class TestScanningMonitor(TreeTestCase):
+
+    def setUp(self):
+        TreeTestCase.setUp(self)
+        os.mkdir(os.path.join(self.root, 'package'))
+        self.existing = self.write('package/test_existing.py')
+        CountingScanningMonitor.folders_read = []
+        file_finder = FileFinder(self.root, wildcard_to_regex('*.py'))
+        self.monitor = CountingScanningMonitor(file_finder)
+        self.monitor.folders_read = []
+
+    def test_nothing_changed(self):
+        self.assertFalse(self.monitor.look_for_changes())
+
+    def test_unchanged_folders_are_not_listed_again(self):
+        self.monitor.look_for_changes()
+        self.assertEqual([], self.monitor.folders_read)
+
+    def test_modified_file_is_reported(self):
+        self.write('package/test_existing.py', '# more content\n')
+        self.assertTrue(self.monitor.look_for_changes())
+        self.assertEqual(set([self.existing]), self.monitor.changed_files)
+
+    def test_modification_time_change_is_reported(self):
+        stat = os.stat(self.existing)
+        os.utime(self.existing, (stat.st_atime, stat.st_mtime + 10))
+        self.assertTrue(self.monitor.look_for_changes())
+
+    def test_added_file_is_reported(self):
+        path = self.write('test_new.py')
+        self.assertTrue(self.monitor.look_for_changes())
+        self.assertEqual(set([path]), self.monitor.changed_files)
+
+    def test_not_matching_file_is_ignored(self):
+        self.write('notes.txt')
+        self.assertFalse(self.monitor.look_for_changes())
+
+    def test_removed_file_is_reported(self):
+        os.remove(self.existing)
+        self.assertTrue(self.monitor.look_for_changes())
+        self.assertEqual(set([self.existing]), self.monitor.changed_files)
+
+    def test_files_in_removed_folder_are_reported(self):
+        shutil.rmtree(os.path.join(self.root, 'package'))
+        self.assertTrue(self.monitor.look_for_changes())
+        self.assertEqual(set([self.existing]), self.monitor.changed_files)
+
+    def test_change_is_only_detected_once(self):
+        self.write('test_new.py')
+        self.monitor.look_for_changes()
+        self.assertFalse(self.monitor.look_for_changes())
+
+if __name__ == '__main__':
+    unittest.main()
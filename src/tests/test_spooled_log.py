@@ -0,0 +1,64 @@
+# coding: utf-8
+import os
+import shutil
+import tempfile
+import unittest
+
+from pytddmon import (
+    Pytddmon, SpooledLog, event_stream, log_text, spool_long_log)
+from tests.helpers import FakeMonitor
+
+
+class TestSpooledLog(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        event_stream.spool_folder = None
+        shutil.rmtree(self.folder)
+
+    def test_logs_are_read_back(self):
+        first = SpooledLog.write(self.folder, u'first log\n')
+        second = SpooledLog.write(self.folder, u'second l\xf6g\n')
+        self.assertEqual(first.path, second.path)
+        self.assertEqual(u'first log\n', log_text(first))
+        self.assertEqual(u'second l\xf6g\n', log_text(second))
+
+    def test_plain_logs_are_their_own_text(self):
+        self.assertEqual('log', log_text('log'))
+
+    def test_missing_spool_file(self):
+        log = SpooledLog(os.path.join(self.folder, 'gone.log'), 0, 10)
+        self.assertIn('no longer available', log_text(log))
+
+    def test_only_long_logs_are_spooled(self):
+        event_stream.spool_folder = self.folder
+        short = ('module', 0, 1, 'F')
+        self.assertEqual(short, spool_long_log(short))
+        long_log = 'F' * SpooledLog.min_length
+        spooled = spool_long_log(('module', 0, 1, long_log))
+        self.assertTrue(isinstance(spooled[3], SpooledLog))
+        self.assertEqual(long_log, log_text(spooled[3]))
+
+    def test_unused_spool_files_are_removed(self):
+        pytddmon = Pytddmon(lambda: [], FakeMonitor())
+        pytddmon.spool_folder = self.folder
+        used = SpooledLog.write(self.folder, u'used')
+        unused_path = os.path.join(self.folder, 'unused.log')
+        open(unused_path, 'w').close()
+        pytddmon.results = {'test.py': ('test', 0, 1, used)}
+        pytddmon.clean_spool_folder()
+        self.assertTrue(os.path.exists(used.path))
+        self.assertFalse(os.path.exists(unused_path))
+
+    def test_spool_files_of_the_log_shown_are_kept(self):
+        pytddmon = Pytddmon(lambda: [], FakeMonitor())
+        pytddmon.spool_folder = self.folder
+        shown = SpooledLog.write(self.folder, u'shown')
+        pytddmon.log.add_module('test', 0, 1, shown)
+        pytddmon.clean_spool_folder()
+        self.assertEqual(u'shown', log_text(shown))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# coding: utf-8
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from pytddmon import (
+    find_test_functions_in_module, find_tests_in_module, run_suite)
+
+MODULE = '''
+import os
+
+calls = []
+
+
+def resource():
+    calls.append('set up')
+    yield 'resource'
+    calls.append('tear down')
+
+
+def name(resource):
+    return 'name of ' + resource
+
+
+def test_fixtures(name, resource):
+    assert name == 'name of resource'
+    assert resource == 'resource'
+
+
+def test_fails():
+    assert 1 == 2
+
+
+def test_unknown_fixture(nonexistent):
+    pass
+
+
+def test_tmp_path(tmp_path):
+    assert os.path.isdir(str(tmp_path))
+
+
+def helper(argument):
+    pass
+'''
+
+APP_MODULE = '''
+calls = []
+
+
+def test_connection(host):
+    calls.append('test_connection')
+
+
+def testing():
+    calls.append('testing')
+'''
+
+
+class TestTestFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        with open(os.path.join(self.folder, 'test_functions_module.py'),
+                  'w') as f:
+            f.write(MODULE)
+        with open(os.path.join(self.folder, 'app_module.py'), 'w') as f:
+            f.write(APP_MODULE)
+        sys.path.insert(0, self.folder)
+
+    def tearDown(self):
+        sys.path.remove(self.folder)
+        sys.modules.pop('test_functions_module', None)
+        sys.modules.pop('app_module', None)
+        shutil.rmtree(self.folder)
+
+    def test_test_functions_are_collected_in_order(self):
+        suite = find_test_functions_in_module('test_functions_module')
+        self.assertEqual(
+            ['test_functions_module.test_fixtures',
+             'test_functions_module.test_fails',
+             'test_functions_module.test_unknown_fixture',
+             'test_functions_module.test_tmp_path'],
+            [test.id() for test in suite]
+        )
+
+    def test_test_functions_run_with_fixtures(self):
+        suite = find_test_functions_in_module('test_functions_module')
+        (green, total, log) = run_suite(suite)
+        self.assertEqual((2, 4), (green, total))
+        self.assertIn("fixture 'nonexistent' not found", log)
+
+    def test_generator_fixtures_are_torn_down(self):
+        suite = find_test_functions_in_module('test_functions_module')
+        run_suite(suite)
+        self.assertEqual(
+            ['set up', 'tear down'],
+            sys.modules['test_functions_module'].calls
+        )
+
+    def test_functions_of_other_modules_are_not_run(self):
+        suite = find_tests_in_module('app_module')
+        (green, total, log) = run_suite(suite)
+        self.assertEqual((0, 0), (green, total))
+        self.assertEqual([], sys.modules['app_module'].calls)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,10 @@
+def number():
+    return 1
+
+
+def test_green(number):
+    assert number == 1
+
+
+def test_red(number):
+    assert number == 2
@@ -0,0 +1 @@
+../../src/pytddmon.py
\ No newline at end of file
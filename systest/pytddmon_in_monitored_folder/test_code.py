@@ -0,0 +1,5 @@
+﻿import unittest
+
+class TestCase(unittest.TestCase):
+    def test_something(self):
+        self.assertTrue(True)
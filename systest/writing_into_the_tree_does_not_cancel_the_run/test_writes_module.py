@@ -0,0 +1,21 @@
+import os
+import time
+import unittest
+
+GENERATED = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'generated_mod.py')
+
+
+class TestWritesModule(unittest.TestCase):
+    def tearDown(self):
+        if os.path.exists(GENERATED):
+            os.remove(GENERATED)
+
+    def test_writes_module(self):
+        with open(GENERATED, 'w') as f:
+            f.write('x = 1\n')
+        time.sleep(1.2)
+        self.assertTrue(os.path.exists(GENERATED))
+
+    def test_other(self):
+        pass